@@ -0,0 +1,79 @@
+"""页面渲染路径微基准
+
+对比旧路径（samples字节拷贝 + rgbSwapped + fromImage）与当前零拷贝路径，
+输出各缩放级别下每次渲染的耗时与分配字节数。
+
+用法: python -m Benchmarks.RenderBenchmark <pdf文件> [页码] [重复次数]
+无显示环境下可设置 QT_QPA_PLATFORM=offscreen。
+"""
+import sys
+import time
+import tracemalloc
+import fitz  # PyMuPDF
+from PyQt5.QtGui import QGuiApplication, QImage, QPixmap
+from Workers.PageRenderWorker import pixmap_to_qimage
+
+ZOOM_LEVELS = [1.0, 2.0, 4.0, 6.0, 10.0]
+
+
+def legacy_render(page, zoom):
+    """旧实现：三次整帧拷贝，返回拷贝的字节数"""
+    pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+    samples = pix.samples  # 拷贝1：bytes副本
+    img = QImage(samples, pix.width, pix.height, pix.stride, QImage.Format_RGB888).rgbSwapped()  # 拷贝2
+    pixmap = QPixmap.fromImage(img)  # 拷贝3
+    return len(samples) + img.sizeInBytes() + pixmap_bytes(pixmap)
+
+
+def zero_copy_render(page, zoom):
+    """当前实现：仅在生成QPixmap时拷贝一次"""
+    pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+    img = pixmap_to_qimage(pix)
+    pixmap = QPixmap.fromImage(img)
+    return pixmap_bytes(pixmap)
+
+
+def pixmap_bytes(pixmap):
+    return pixmap.width() * pixmap.height() * pixmap.depth() // 8
+
+
+def measure(render, page, zoom, repeat):
+    """返回 (平均毫秒, 每次拷贝字节数, Python堆峰值字节数)"""
+    render(page, zoom)  # 预热
+    tracemalloc.start()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        copied = render(page, zoom)
+    elapsed = (time.perf_counter() - start) * 1000 / repeat
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, copied, peak
+
+
+def main(argv):
+    if len(argv) < 2:
+        print(__doc__)
+        return 1
+    page_num = int(argv[2]) if len(argv) > 2 else 0
+    repeat = int(argv[3]) if len(argv) > 3 else 5
+
+    app = QGuiApplication(argv)  # QPixmap需要GUI应用实例
+    doc = fitz.open(argv[1])
+    page = doc.load_page(page_num)
+
+    header = f"{'zoom':>6} {'pixels':>12} | {'legacy ms':>10} {'legacy MB':>10} | {'zero-copy ms':>12} {'zero-copy MB':>12} | {'py heap KB (old/new)':>20}"
+    print(header)
+    print('-' * len(header))
+    for zoom in ZOOM_LEVELS:
+        rect = page.rect
+        pixels = int(rect.width * zoom) * int(rect.height * zoom)
+        old_ms, old_bytes, old_peak = measure(legacy_render, page, zoom, repeat)
+        new_ms, new_bytes, new_peak = measure(zero_copy_render, page, zoom, repeat)
+        print(f"{zoom:>6.1f} {pixels:>12,} | {old_ms:>10.1f} {old_bytes / 2**20:>10.1f} | "
+              f"{new_ms:>12.1f} {new_bytes / 2**20:>12.1f} | {old_peak / 1024:>10.0f}/{new_peak / 1024:<9.0f}")
+    del app
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -1,93 +1,92 @@
 import os
-import json
-import re
 import time
 import html
-from markdown import markdown
+from collections import deque, OrderedDict
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
                             QLabel, QPushButton, QTextEdit, QListWidget, QTabWidget,
                             QSplitter, QFileDialog, QMessageBox, QDialog, QAbstractItemView,
                             QStatusBar, QMenu, QListWidgetItem, QTextBrowser)
 from PyQt5.QtCore import Qt, QTimer
 from PyQt5.QtCore import QFile, QTextStream
-from PyQt5.QtGui import QTextCursor, QIcon, QTextBlockFormat
-from Config.Config import ANALYSIS_DIR, CONTENT_FILE
+from PyQt5.QtGui import QTextCursor, QIcon, QTextCharFormat
+from Config.Config import (ANALYSIS_DIR, CONTENT_FILE, CHAT_TAIL_MESSAGES, CATALOG_FLUSH_MS, CATALOG_CHECKPOINT_MINUTES,
+                           CHAT_HTML_CACHE_SIZE)
 from Dailog.SettingDialog import SettingsDialog
+from Dailog.LibrarySearchDialog import LibrarySearchDialog
 from Components.NoteManagementWidget import NoteManagementWidget
 from Components.PDFViewerWidget import PDFViewerWidget
 from Utils.ChatTextEdit import ChatTextEdit
 from Utils.MarkdownHighlighter import MarkdownHighlighter
-from Workers.AnalysisWorker import AnalysisWorker
 from Workers.ChatWorker import ChatWorker
-from Workers.FileUploadWorder import FileUploadWorker
+from Utils.TextIndex import DocumentTextIndex
+from Utils.PassageIndex import PassageIndex
+from Utils.LibraryIndex import LibraryIndex
+from Workers.LibraryIndexWorker import LibraryIndexWorker
+from Utils.TextExtraction import shutdown_executor
+from Utils.ImportPipeline import ImportPipeline
+from Utils.MoonshotClient import get_client
+from Utils.ResponseCache import get_cache
+from Utils.ContentTrimmer import format_trim_report
+from Utils.Catalog import LibraryCatalog
+from Utils.MarkdownRenderer import get_renderer
+
+
+LOAD_EARLIER_URL = "load-earlier"  # 聊天记录顶部"加载更早消息"链接
 
 
 class LiteratureManager(QMainWindow):
     def __init__(self):
         super().__init__()
+        self.startup_time = time.perf_counter()  # 用于统计启动到可交互的耗时
         self.setWindowTitle("智能文献分析系统")
         self.setGeometry(100, 100, 1200, 800)
         self.showMaximized()
-        self.content = self.load_content()
-        self.api_key = self.content.get('api_key', '')
+        self.catalog = LibraryCatalog()  # 文献库（SQLite），按记录增量读写
+        self.migrate_legacy_library()
+        self.api_key = self.catalog.get_setting('api_key', '')
+        # 写入延后合并提交，未满一批时最迟 CATALOG_FLUSH_MS 后提交
+        self.catalog_flush_timer = QTimer(self)
+        self.catalog_flush_timer.setSingleShot(True)
+        self.catalog_flush_timer.setInterval(CATALOG_FLUSH_MS)
+        self.catalog_flush_timer.timeout.connect(self.catalog.flush)
+        # 定期在后台合并WAL日志
+        self.catalog_checkpoint_timer = QTimer(self)
+        self.catalog_checkpoint_timer.timeout.connect(self.catalog.checkpoint)
+        self.catalog_checkpoint_timer.start(CATALOG_CHECKPOINT_MINUTES * 60 * 1000)
         self.papers = []
         self.current_paper = None
         self.workers = []
         self.setWindowIcon(QIcon('assets/logo.png'))  # 设置窗口图标
 
         self.chat_processing = False  # 新增聊天处理状态
-        
+        self.chat_selection = None  # 最近一次"提问"的框选 (页码, 文本)，随问题一起检索所在段落
+        self.stream_start = None  # 流式回复在聊天记录中的起始位置
+        self.message_html_cache = OrderedDict()  # (角色, 类型, 内容) -> 消息HTML，避免重复渲染Markdown
+        self.upload_processing = False
+        self.analysis_processing = False
+
+        self.missing_analyses = deque()  # 启动后在后台逐个补交分析任务的文献
+        self.pending_index = deque()  # 等待建立全文索引的文献 (路径, 名称, 逐页文本或None)
+        self.index_worker = None  # 同一时间只有一个索引线程，结束后即释放
+
+        # 导入流水线：提取 -> 精简 -> 分析
+        self.import_pipeline = ImportPipeline(self.api_key, self)
+        self.import_pipeline.paper_imported.connect(self.handle_upload_success)
+        self.import_pipeline.analysis_complete.connect(self.save_analysis_result)
+        self.import_pipeline.error_occurred.connect(self.handle_pipeline_error)
+        self.import_pipeline.progress_changed.connect(self.on_pipeline_progress)
+
         os.makedirs(ANALYSIS_DIR, exist_ok=True)
+        self.library_index = LibraryIndex()  # 全文检索索引（界面线程只读）
+        self.library_search_dialog = None
         self.init_ui()
         self.apply_styles()
         self.load_papers()
         self.pdf_viewer.note_add_requested.connect(self.handle_note_add_request)
         self.pdf_viewer.translate_requested.connect(self.handle_translation_request)  # 连接翻译信号
+        # 窗口可交互后再补建索引、补交分析
+        QTimer.singleShot(0, self.finish_startup)
 
-        # 添加上传和分析队列
-        self.upload_queue = []
-        self.upload_processing = False
-        self.analysis_queue = []
-        self.analysis_processing = False
-
-        self.request_queue = []
-        self.active_requests = 0
-        self.MAX_CONCURRENT = 4  # 最大并发请求数
-        self.last_request_time = 0
-
-    def enqueue_request(self, worker, request_type):
-        """将请求加入队列"""
-        self.request_queue.append((worker, request_type))
-        self.process_queue()
-
-    def process_queue(self):
-        """处理队列中的请求"""
-        while self.active_requests < self.MAX_CONCURRENT and self.request_queue:
-            # 确保请求间隔至少1秒
-            elapsed = time.time() - self.last_request_time
-            if elapsed < 1.2:
-                QTimer.singleShot(int((1.2 - elapsed)*1000), self.process_queue)
-                return
-
-            worker, req_type = self.request_queue.pop(0)
-            self.active_requests += 1
-            self.last_request_time = time.time()
-            
-            # 连接信号
-            if req_type == 'chat':
-                worker.response_received.connect(self._handle_success_response)
-            elif req_type == 'analysis':
-                worker.analysis_complete.connect(self.save_analysis_result)
-            elif req_type == 'file':
-                worker.upload_complete.connect(lambda data, name, is_local: self.handle_upload_success(data, name, is_local))
-            
-            worker.error_occurred.connect(self.handle_error)
-            worker.finished.connect(lambda: self.request_finished())
-            worker.start()
-
-    def request_finished(self):
-        self.active_requests -= 1
-        self.process_queue()
 
     def apply_styles(self):
         """从外部文件加载样式"""
@@ -97,88 +96,33 @@ class LiteratureManager(QMainWindow):
             self.setStyleSheet(stream.readAll())
             style_file.close()
 
-    def load_content(self):
-        """加载配置文件内容，若不存在则创建并返回默认配置"""
-        # 确保配置文件目录存在
-        config_dir = os.path.dirname(CONTENT_FILE)
-        if config_dir:
-            os.makedirs(config_dir, exist_ok=True)
-
-        # 如果文件不存在则初始化
-        if not os.path.isfile(CONTENT_FILE):
-            default_config = {
-                'api_key': '',
-                'papers': []
-            }
-            with open(CONTENT_FILE, 'w', encoding='utf-8') as f:
-                json.dump(default_config, f, ensure_ascii=False, indent=2)
-            return default_config
-
-        # 加载现有配置（添加异常处理）
+    def migrate_legacy_library(self):
+        """首次启动时把旧版 content.json 及附属文件导入文献库，旧文件保留作备份"""
         try:
-            with open(CONTENT_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except (json.JSONDecodeError, IOError) as e:
-            raise RuntimeError(f"Failed to load config: {str(e)}")
-
-    def save_content(self):
-        papers_content = []
-        for paper in self.papers:
-            papers_content.append({
-                'name': paper['name'],
-                'path': paper['path'],
-                'content_path': paper['content_path'],
-                'analysis_path': paper['analysis_path'],
-                'chat_history_path': paper['chat_history_path'],
-                'notes_path': paper['notes_path']  # 新增此行
-            })
-        self.content['papers'] = papers_content
-        with open(CONTENT_FILE, 'w', encoding='utf-8') as f:
-            json.dump(self.content, f, ensure_ascii=False, indent=2)
+            count = self.catalog.migrate_from_json(CONTENT_FILE)
+            if count:
+                print(f"已从 {CONTENT_FILE} 迁移 {count} 篇文献")
+        except Exception as e:
+            QMessageBox.warning(self, "迁移错误", f"旧版文献库迁移失败: {str(e)}")
 
     def load_papers(self):
-        """从配置文件加载已有文献数据"""
+        """从文献库加载文献列表
+
+        启动时只读取名称与路径，分析结果、笔记和聊天记录在首次打开文献时加载。
+        """
         try:
-            for p in self.content.get('papers', []):
-                # 生成安全名称用于路径
-                safe_name = re.sub(r'[\\/*?:"<>|]', '_', p['name'])
-                # 动态生成notes_path（如果配置中不存在）
-                notes_path = p.get('notes_path', os.path.join(ANALYSIS_DIR, f"{safe_name}_notes.json"))
-                
+            for p in self.catalog.list_papers():
                 paper = {
+                    'id': p['id'],
                     'name': p['name'],
                     'path': p['path'],
-                    'content_path': p['content_path'],
-                    'analysis_path': p['analysis_path'],
-                    'chat_history_path': p['chat_history_path'],
-                    'notes_path': notes_path,  # 确保存在该键
                     'analysis': None,
                     'chat_history': [],
-                    'notes': []
+                    'notes': [],
+                    'loaded': False  # 分析结果与笔记是否已从文献库加载
                 }
-                
-                # 加载分析结果
-                need_analysis = False
-                if os.path.exists(paper['analysis_path']):
-                    try:
-                        with open(paper['analysis_path'], 'r', encoding='utf-8') as f:
-                            paper['analysis'] = f.read()
-                    except Exception as e:
-                        print(f"读取分析结果失败: {e}")
-                        need_analysis = True
-                else:
-                    need_analysis = True
-                    
-                if need_analysis:
-                    self.start_analysis(paper)
-
-                # 加载笔记文件
-                if os.path.exists(paper['notes_path']):
-                    try:
-                        with open(paper['notes_path'], 'r', encoding='utf-8') as f:
-                            paper['notes'] = json.load(f)
-                    except Exception as e:
-                        print(f"加载笔记失败: {e}")
+                if not p['has_analysis']:
+                    self.missing_analyses.append(paper)
 
                 # 创建带路径标识的列表项
                 item = QListWidgetItem(paper['name'])
@@ -195,6 +139,84 @@ class LiteratureManager(QMainWindow):
         except Exception as e:
             QMessageBox.critical(self, "加载错误", f"加载文献失败: {str(e)}")
 
+    def schedule_catalog_flush(self):
+        """短时间内的多次写入合并为一次提交；关闭窗口时由catalog.close统一提交"""
+        if not self.catalog_flush_timer.isActive():
+            self.catalog_flush_timer.start()
+
+    def hydrate_paper(self, paper):
+        """首次打开文献时加载分析结果与笔记"""
+        if paper.get('loaded'):
+            return
+        paper['analysis'] = self.catalog.get_analysis(paper['id'])
+        paper['notes'] = self.catalog.get_notes(paper['id'])
+        paper['loaded'] = True
+
+    def finish_startup(self):
+        """事件循环开始后执行：报告启动耗时，后台补建索引与补交分析"""
+        elapsed_ms = (time.perf_counter() - self.startup_time) * 1000
+        print(f"启动完成：{len(self.papers)} 篇文献，可交互耗时 {elapsed_ms:.0f} ms")
+        self.update_status(f"已加载 {len(self.papers)} 篇文献（启动用时 {elapsed_ms:.0f} ms）")
+        self.index_missing_papers()
+        self.queue_next_missing_analysis()
+
+    def queue_next_missing_analysis(self):
+        """每次事件循环只提交一篇，避免大量缺失分析时阻塞界面"""
+        while self.missing_analyses:
+            paper = self.missing_analyses.popleft()
+            if paper in self.papers and paper['analysis'] is None:
+                self.start_analysis(paper)
+                QTimer.singleShot(0, self.queue_next_missing_analysis)
+                return
+
+    def index_missing_papers(self):
+        """为尚未建立全文索引的文献补建索引"""
+        indexed = self.library_index.indexed_paths()
+        missing = [(p['path'], p['name'], None) for p in self.papers if p['path'] not in indexed]
+        if missing:
+            self.index_papers(missing)
+
+    def index_papers(self, entries):
+        """entries: [(路径, 名称, 逐页文本或None)]，排队后由单个索引线程依次处理"""
+        self.pending_index.extend(entries)
+        self.start_next_index()
+
+    def start_next_index(self):
+        if self.index_worker is not None or not self.pending_index:
+            return
+        entries = list(self.pending_index)
+        self.pending_index.clear()
+        self.index_worker = LibraryIndexWorker(entries)
+        self.index_worker.error_occurred.connect(lambda error: print(error))
+        self.index_worker.finished.connect(self.on_index_worker_finished)
+        self.index_worker.start()
+
+    def on_index_worker_finished(self):
+        # 释放线程及其持有的逐页文本，再处理期间新排队的文献
+        self.index_worker.wait()
+        self.index_worker = None
+        self.start_next_index()
+
+    def show_library_search(self):
+        if self.library_search_dialog is None:
+            self.library_search_dialog = LibrarySearchDialog(self.library_index, self)
+            self.library_search_dialog.result_activated.connect(self.open_paper_at)
+        self.library_search_dialog.show()
+        self.library_search_dialog.raise_()
+        self.library_search_dialog.query_input.setFocus()
+
+    def open_paper_at(self, paper_path, page_num):
+        """打开文献并跳转到指定页（全文检索结果）"""
+        for row in range(self.paper_list.count()):
+            item = self.paper_list.item(row)
+            if item.data(Qt.UserRole) == paper_path:
+                self.paper_list.setCurrentItem(item)
+                if not self.current_paper or self.current_paper['path'] != paper_path:
+                    self.show_paper_details(item)
+                self.pdf_viewer.go_to_page(page_num)
+                return
+        self.update_status("该文献已不在文献库中")
+
     def handle_note_add_request(self, page, pdf_rect):
         if not self.current_paper:
             return
@@ -226,6 +248,7 @@ class LiteratureManager(QMainWindow):
             prompt,
             is_translation=True
         )
+        worker.chunk_received.connect(lambda text: self._append_stream_chunk(text, role_tag="翻译结果"))
         worker.response_received.connect(self.handle_translation_response)
         worker.error_occurred.connect(self.handle_translation_error)
         worker.finished.connect(self.on_translation_finished)  # 新增完成信号连接
@@ -239,7 +262,7 @@ class LiteratureManager(QMainWindow):
     def handle_translation_response(self, response):
         """处理翻译响应"""
         # 删除正在翻译提示
-        self._remove_thinking_message()
+        self._end_pending_message()
         translated_text = response['content']
         # 使用不同的样式显示翻译结果
         self.append_chat_message("assistant", translated_text, role_tag="翻译结果")
@@ -247,7 +270,7 @@ class LiteratureManager(QMainWindow):
     def handle_translation_error(self, error):
         """处理翻译错误"""
         # 删除正在翻译提示
-        self._remove_thinking_message()
+        self._end_pending_message()
         self.append_chat_message("system", f"翻译失败：{error}")
 
     def init_ui(self):
@@ -265,7 +288,9 @@ class LiteratureManager(QMainWindow):
         menubar = self.menuBar()
         file_menu = menubar.addMenu("文件")
         file_menu.addAction("导入文献", self.import_papers)
+        file_menu.addAction("全文检索", self.show_library_search, "Ctrl+Shift+F")
         file_menu.addAction("设置", self.show_settings)
+        file_menu.addAction("API连接统计", self.show_api_stats)
         file_menu.addAction("退出", self.close)
 
         # 主界面分割布局
@@ -302,6 +327,7 @@ class LiteratureManager(QMainWindow):
         center_layout.addWidget(QLabel("文献内容"))
         self.pdf_viewer = PDFViewerWidget()
         self.pdf_viewer.text_selected.connect(self.handle_selected_text)
+        self.pdf_viewer.selection_asked.connect(self.handle_selection_asked)
         center_layout.addWidget(self.pdf_viewer)
 
         # ================== 右侧面板（智能问答） ==================
@@ -336,8 +362,8 @@ class LiteratureManager(QMainWindow):
 
     def update_page_label(self, page_num):
         """更新页码显示"""
-        if self.pdf_viewer.doc:
-            total = len(self.pdf_viewer.doc)
+        if self.pdf_viewer.doc is not None:
+            total = self.pdf_viewer.page_count
             self.page_label.setText(f"第 {page_num + 1} 页 / 共 {total} 页")
 
     def show_paper_list_context_menu(self, pos):
@@ -379,16 +405,17 @@ class LiteratureManager(QMainWindow):
         # 遍历删除每个文献
         for paper in papers_to_delete:
             try:
-                # 删除本地文件
+                # 删除文献记录（分析、聊天记录与笔记一并删除）和本地索引文件
+                self.catalog.delete_paper(paper['id'])
                 files_to_delete = [
-                    paper['content_path'],
-                    paper['analysis_path'],
-                    paper['chat_history_path'],
-                    paper['notes_path']
+                    DocumentTextIndex.index_path(paper['path']),
+                    PassageIndex.index_path(paper['path'])
                 ]
                 for file_path in files_to_delete:
                     if os.path.exists(file_path):
                         os.remove(file_path)
+                self.library_index.remove_paper(paper['path'])
+                PassageIndex.forget(paper['path'])
                 
                 # 从内存中移除
                 if paper in self.papers:
@@ -410,11 +437,9 @@ class LiteratureManager(QMainWindow):
             self.pdf_viewer.load_pdf(None)
             self.analysis_display.clear()
             self.chat_history.clear()
+            self.stream_start = None
             self.note_manager.set_paper(None)
         
-        # 更新配置文件
-        self.save_content()
-        
         # 显示操作结果
         if errors:
             QMessageBox.warning(self, "删除完成", "删除过程中发生以下错误：\n" + "\n".join(errors))
@@ -443,6 +468,9 @@ class LiteratureManager(QMainWindow):
         tab.setLayout(layout)
         return tab
 
+    def handle_selection_asked(self, page_num, text):
+        self.chat_selection = (page_num, text)
+
     def handle_selected_text(self, text):
         """将选中文本填入输入框，并自动聚焦"""
         if text and self.current_paper:
@@ -462,6 +490,8 @@ class LiteratureManager(QMainWindow):
         
         # 聊天历史区域
         self.chat_history = QTextBrowser()
+        self.chat_history.setOpenLinks(False)
+        self.chat_history.anchorClicked.connect(self.on_chat_anchor_clicked)
 
         
         # 输入区域容器
@@ -523,14 +553,16 @@ class LiteratureManager(QMainWindow):
         
         # 清空界面显示
         self.chat_history.clear()
+        self.stream_start = None
         
         # 清空内存数据
         self.current_paper['chat_history'] = []
+        self.current_paper['chat_earlier'] = 0
         
         # 清空本地存储
         try:
-            with open(self.current_paper['chat_history_path'], 'w', encoding='utf-8') as f:
-                json.dump([], f, ensure_ascii=False, indent=2)
+            self.catalog.clear_chat(self.current_paper['id'])
+            self.schedule_catalog_flush()
         except Exception as e:
             QMessageBox.critical(self, "保存错误", f"清空聊天记录失败: {str(e)}")
         
@@ -554,7 +586,7 @@ class LiteratureManager(QMainWindow):
 
         # 获取所有现有文献路径（内存级快速比对）
         existing_paths = {p['path'] for p in self.papers}  # 使用集合加速查找
-        queued_paths = set(self.upload_queue)  # 当前队列中的路径
+        queued_paths = self.import_pipeline.pending_paths()  # 正在导入的路径
         
         # 快速过滤新文件（O(1)时间复杂度查找）
         new_files = [
@@ -572,8 +604,8 @@ class LiteratureManager(QMainWindow):
             self.update_status("没有需要添加的新文献")
             return
 
-        # 批量添加新文件到上传队列
-        self.upload_queue.extend(new_files)
+        # 批量添加新文件到导入流水线
+        self.import_pipeline.submit(new_files)
         
         # 可视化队列状态（优化大量文件时的显示）
         MAX_DISPLAY = 5  # 最多显示前5个文件名
@@ -586,138 +618,81 @@ class LiteratureManager(QMainWindow):
             "\n".join(f"· {name}" for name in display_files)
         )
 
-        # 智能延迟处理（在主线程空闲时启动）
-        if not self.upload_processing:
-            QTimer.singleShot(100, self.process_next_upload)  # 100ms后启动
-        else:
-            # 实时更新队列进度
-            self.status_bar.showMessage(
-                f"队列运行中，新增 {len(new_files)} 个待处理文件...", 
-                3000  # 3秒后自动清除
-            )
-
         # 即时释放文件列表内存
         del files  
         del existing_paths
         del queued_paths
 
-    def process_next_upload(self):
-        """ 处理上传队列中的下一个文件 """
-        if not self.upload_queue:
-            self.upload_processing = False
-            self._set_ui_interactive()
-            return
-
-        self.upload_processing = True
+    def on_pipeline_progress(self):
+        """根据流水线各阶段状态更新界面"""
+        pipeline = self.import_pipeline
+        self.upload_processing = pipeline.is_busy(pipeline.EXTRACT) or pipeline.is_busy(pipeline.REFINE)
+        self.analysis_processing = pipeline.is_busy(pipeline.ANALYZE)
         self._set_ui_interactive()
-        file_path = self.upload_queue.pop(0)
-
-        # 跳过已存在的文件
-        if any(p['path'] == file_path for p in self.papers):
-            self.update_status(f"跳过重复文件: {os.path.basename(file_path)}")
-            QTimer.singleShot(0, self.process_next_upload)  # 立即处理下一个
-            return
-
-        worker = FileUploadWorker(self.api_key, file_path)
-        worker.upload_complete.connect(lambda data, name, is_local: self.handle_upload_success(data, name, is_local))
-        worker.error_occurred.connect(self.handle_upload_error)
-        worker.finished.connect(self.process_next_upload)
-        worker.start()
-        self.workers.append(worker)
-        self.update_status(f"正在上传 {os.path.basename(file_path)}...")
+        if self.upload_processing or self.analysis_processing:
+            counts = pipeline.counts()
+            self.status_bar.showMessage(
+                "导入中 — " + "  ".join(
+                    f"{label} 运行{counts[name][1]}/排队{counts[name][0]}"
+                    for name, label in ((pipeline.EXTRACT, "提取"), (pipeline.REFINE, "精简"), (pipeline.ANALYZE, "分析"))
+                )
+            )
 
     def handle_upload_success(self, file_data, paper_name, is_local):
         try:
-            # 生成安全文件名用于本地存储
-            safe_name = re.sub(r'[\\/*?:"<>|]', '_', paper_name)
-            content_path = file_data['content_path']
+            # 写入文献库，路径重复时跳过
+            paper_id = self.catalog.add_paper(paper_name, file_data['path'], file_data['content'])
+            if paper_id is None or any(p['path'] == file_data['path'] for p in self.papers):
+                self.update_status(f"⚠️ {paper_name} 已存在，跳过添加")
+                return
 
             # 构建文献数据对象
             paper = {
+                'id': paper_id,
                 'name': paper_name,
                 'path': file_data['path'],
-                'content_path': content_path,
-                'analysis_path': os.path.join(ANALYSIS_DIR, f"{safe_name}.txt"),
-                'chat_history_path': os.path.join(ANALYSIS_DIR, f"{safe_name}_chat.json"),
-                'notes_path': os.path.join(ANALYSIS_DIR, f"{safe_name}_notes.json"),
                 'analysis': None,
                 'chat_history': [],
-                'notes': []
+                'notes': [],
+                'loaded': True
             }
 
-            # 检查重复文献
-            if any(p['path'] == paper['path'] for p in self.papers):
-                self.update_status(f"⚠️ {paper_name} 已存在，跳过添加")
-                return
-
             # 创建列表项
             item = QListWidgetItem(paper_name)
             item.setData(Qt.UserRole, paper['path'])
             self.paper_list.addItem(item)
             self.papers.append(paper)
-            self.save_content()
+            self.index_papers([(paper['path'], paper_name, file_data.get('pages'))])
 
-            # 将分析任务加入队列
-            self.analysis_queue.append(paper)
-            if not self.analysis_processing:
-                self.process_next_analysis()  # 此方法内部会更新状态
+            # 分析任务由流水线在精简完成后自动排队
             status_msg = "本地解析完成，已加入分析队列" if is_local else "上传完成，已加入分析队列"
+            if file_data.get('trim_report'):
+                status_msg += f"；{format_trim_report(file_data['trim_report'])}"
             self.update_status(f"✅ {paper_name} {status_msg}")
-            
-            # 如果没有正在进行的分析任务，启动队列处理
-            if not self.analysis_processing:
-                self.process_next_analysis()
 
         except Exception as e:
             error_msg = f"文献处理失败: {str(e)}"
             self.error_occurred.emit(error_msg)
             self.update_status(f"❌ {error_msg}")
 
-    def process_next_analysis(self):
-        """ 处理分析队列中的下一个任务 """
-        if not self.analysis_queue:
-            self.analysis_processing = False
-            self._set_ui_interactive()
-            return
-
-        self.analysis_processing = True
-        self._set_ui_interactive()
-        paper = self.analysis_queue.pop(0)
-
-        with open(paper['content_path'], 'r', encoding='utf-8') as f:
-            content = f.read()
-
-        worker = AnalysisWorker(self.api_key, content, paper['name'], paper['path'])
-        worker.analysis_complete.connect(self.save_analysis_result)
-        worker.error_occurred.connect(self.handle_analysis_error)
-        worker.finished.connect(self.process_next_analysis)
-        worker.start()
-        self.workers.append(worker)
-        self.update_status(f"开始分析 {paper['name']}...")
+    def handle_pipeline_error(self, stage, error):
+        if stage == self.import_pipeline.ANALYZE:
+            self.handle_analysis_error(error)
+        else:
+            self.handle_upload_error(error)
 
     def handle_upload_error(self, error):
         QMessageBox.critical(self, "上传错误", error)
         self.update_status("上传失败")
-        # 新增以下两行
-        self.upload_processing = False
-        self._set_ui_interactive()
+        # 队列状态由 on_pipeline_progress 统一维护
 
     def handle_analysis_error(self, error):
         QMessageBox.critical(self, "分析错误", error)
         self.update_status("分析失败")
-        # 新增以下两行
-        self.analysis_processing = False
-        self._set_ui_interactive()
 
     def start_analysis(self, paper):
-        with open(paper['content_path'], 'r', encoding='utf-8') as f:
-            content = f.read()
-        # 添加paper['path']作为第四个参数
-        worker = AnalysisWorker(self.api_key, content, paper['name'], paper['path'])
-        worker.analysis_complete.connect(self.save_analysis_result)
-        worker.error_occurred.connect(self.handle_analysis_error)
-        worker.start()
-        self.workers.append(worker)
+        content = self.catalog.get_content(paper['id'])
+        self.import_pipeline.submit_analysis(content, paper['name'], paper['path'])
         self.update_status(f"开始分析 {paper['name']}...")
 
     def save_analysis_result(self, result, paper_name, paper_path):
@@ -726,18 +701,17 @@ class LiteratureManager(QMainWindow):
         if not target_paper:
             return
         
-        # 写入分析结果到指定路径
-        with open(target_paper['analysis_path'], 'w', encoding='utf-8') as f:
-            f.write(result)
+        # 写入文献库
+        self.catalog.set_analysis(target_paper['id'], result)
+        self.schedule_catalog_flush()
         target_paper['analysis'] = result
         
-        # 更新当前显示
+        # 更新当前显示；其他文献在后台预先渲染，切换时直接使用缓存
         if self.current_paper and self.current_paper['path'] == paper_path:
             self.analysis_display.setHtml(self._format_markdown(result))
-        self.save_content()
+        else:
+            get_renderer().prerender_analysis(result)
         self.update_status(f"{paper_name} 分析完成")
-        if not self.analysis_processing:
-            self.process_next_analysis()  # 此方法内部会更新状态
 
     def show_paper_details(self, item):
         paper_path = item.data(Qt.UserRole)  # 获取存储的路径
@@ -746,68 +720,47 @@ class LiteratureManager(QMainWindow):
         # 加载PDF文件到阅读器
         self.pdf_viewer.load_pdf(self.current_paper['path'])
         
-        # 确保分析结果已加载
-        if os.path.exists(self.current_paper['analysis_path']):
-            try:
-                with open(self.current_paper['analysis_path'], 'r', encoding='utf-8') as f:
-                    self.current_paper['analysis'] = f.read()
-            except Exception as e:
-                self.current_paper['analysis'] = f"分析结果加载失败：{str(e)}"
-        
-        # 确保分析结果已加载（新增自动生成逻辑）
-        if not self.current_paper.get('analysis') or not os.path.exists(self.current_paper['analysis_path']):
+        # 首次打开时加载分析结果与笔记（缺失分析时自动生成）
+        self.hydrate_paper(self.current_paper)
+        if not self.current_paper.get('analysis'):
             self.start_analysis(self.current_paper)
             self.analysis_display.setPlainText("分析加载中...")
         else:
             self.analysis_display.setHtml(self._format_markdown(self.current_paper['analysis']))
         
-        # 加载聊天记录
-        self.chat_history.clear()
-        if os.path.exists(self.current_paper['chat_history_path']):
-            try:
-                with open(self.current_paper['chat_history_path'], 'r', encoding='utf-8') as f:
-                    self.current_paper['chat_history'] = json.load(f)
-                    for msg in self.current_paper['chat_history']:
-                        role_tag = msg.get('type')  # 获取保存的消息类型
-                        if role_tag == '翻译结果':
-                            self.append_chat_message(msg['role'], msg['content'], save=False, role_tag=role_tag)
-                        elif role_tag == '翻译请求':
-                            self.append_chat_message(msg['role'], msg['content'], save=False, role_tag=role_tag)
-                        else:
-                            self.append_chat_message(msg['role'], msg['content'], save=False)
-            except Exception as e:
-                print(f"加载聊天记录失败: {e}")
+        # 加载聊天记录（只读取最近一页）
+        try:
+            self.current_paper['chat_history'] = self.catalog.get_chat(self.current_paper['id'], CHAT_TAIL_MESSAGES)
+            self.current_paper['chat_earlier'] = self._count_earlier_messages(self.current_paper)
+        except Exception as e:
+            self.current_paper['chat_history'] = []
+            self.current_paper['chat_earlier'] = 0
+            print(f"加载聊天记录失败: {e}")
+        self.render_chat_history()
 
         self.note_manager.set_paper(self.current_paper)
-        # 加载笔记数据
-        self.load_notes(self.current_paper)
         # 刷新PDF显示
         self.pdf_viewer.update()
 
-    # 添加保存和加载笔记的方法
-    def save_notes(self, paper):
+    # 笔记按条写入文献库
+    def add_note(self, paper, note):
+        paper['notes'].append(note)
         try:
-            with open(paper['notes_path'], 'w', encoding='utf-8') as f:
-                json.dump(paper['notes'], f, ensure_ascii=False, indent=2)
+            self.catalog.add_note(paper['id'], note)
+            self.schedule_catalog_flush()
         except Exception as e:
             print(f"保存笔记失败: {e}")
 
-    def load_notes(self, paper):
-        if os.path.exists(paper['notes_path']):
-            try:
-                with open(paper['notes_path'], 'r', encoding='utf-8') as f:
-                    paper['notes'] = json.load(f)
-            except Exception as e:
-                print(f"加载笔记失败: {e}")
+    def delete_note(self, paper, note_id):
+        paper['notes'] = [n for n in paper['notes'] if n['id'] != note_id]
+        try:
+            self.catalog.delete_note(note_id)
+            self.schedule_catalog_flush()
+        except Exception as e:
+            print(f"删除笔记失败: {e}")
 
     def _format_markdown(self, text):
-        # 去除代码块标记
-        text = re.sub(r'^```markdown\s*', '', text, flags=re.MULTILINE | re.IGNORECASE)
-        text = re.sub(r'\s*```$', '', text, flags=re.MULTILINE | re.IGNORECASE)
-        # 转换Markdown为HTML并转义特殊字符
-        html_text = markdown(html.escape(text))
-        # 添加自定义样式
-        return html_text.replace('<code>', '<code style="background-color: #F3F3F3; padding: 2px 4px; border-radius: 3px;">">')
+        return get_renderer().render_analysis(text)
 
     def _role_bg_color(self, role):
         return {
@@ -855,7 +808,36 @@ class LiteratureManager(QMainWindow):
         """增强的消息显示方法，支持翻译标识和样式"""
         # 内容预处理
         content = html.escape(content).encode('utf-8', 'ignore').decode('utf-8')
-        
+
+        # 插入消息
+        cursor = self.chat_history.textCursor()
+        cursor.movePosition(QTextCursor.End)
+        cursor.insertHtml(self._message_html(role, content, role_tag))
+
+        # 保存逻辑
+        if save and self.current_paper:
+            self.current_paper['chat_history'].append({
+                'role': role,
+                'content': content,
+                'type': role_tag or 'normal'  # 记录消息类型
+            })
+            try:
+                self.catalog.append_chat(self.current_paper['id'], role, content, role_tag or 'normal')
+                self.schedule_catalog_flush()
+            except Exception as e:
+                print(f"保存聊天记录失败: {e}")
+
+        # 自动滚动
+        self.chat_history.ensureCursorVisible()
+
+    def _message_html(self, role, content, role_tag=None):
+        """单条消息的HTML，按 (角色, 类型, 内容) 缓存，重新打开文献时不再重复渲染Markdown"""
+        key = (role, role_tag, content)
+        cached = self.message_html_cache.get(key)
+        if cached is not None:
+            self.message_html_cache.move_to_end(key)
+            return cached
+
         # 角色特征配置（新增translator角色）
         role_settings = {
             "user": {
@@ -968,34 +950,67 @@ class LiteratureManager(QMainWindow):
                     width: 100%;
                     max-width: 100%;
                 '>
-                    {markdown(content)}
+                    {get_renderer().render(content)}
                 </div>
             </div>
         </div>
         """
+        message_html += "<hr style='visibility: hidden;'>"
 
-        # 插入消息
-        cursor = self.chat_history.textCursor()
-        cursor.movePosition(QTextCursor.End)
-        cursor.insertHtml(message_html)
-        cursor.insertHtml("<hr style='visibility: hidden;'>")
+        self.message_html_cache[key] = message_html
+        while len(self.message_html_cache) > CHAT_HTML_CACHE_SIZE:
+            self.message_html_cache.popitem(last=False)
+        return message_html
 
-        # 保存逻辑
-        if save and self.current_paper:
-            self.current_paper['chat_history'].append({
-                'role': role,
-                'content': content,
-                'type': role_tag or 'normal'  # 记录消息类型
-            })
-            try:
-                with open(self.current_paper['chat_history_path'], 'w', encoding='utf-8') as f:
-                    json.dump(self.current_paper['chat_history'], f, ensure_ascii=False, indent=2)
-            except Exception as e:
-                print(f"保存聊天记录失败: {e}")
+    def render_chat_history(self, scroll_to_end=True):
+        """一次性渲染当前文献已加载的消息（顶部附"加载更早消息"链接）"""
+        self.chat_history.clear()
+        self.stream_start = None
+        if not self.current_paper:
+            return
+        parts = []
+        earlier = self.current_paper.get('chat_earlier', 0)
+        if earlier:
+            parts.append(f"<p align='center'><a href='{LOAD_EARLIER_URL}'>加载更早的消息（还有 {earlier} 条）</a></p>")
+        for msg in self.current_paper['chat_history']:
+            role_tag = msg.get('type')  # 获取保存的消息类型
+            if role_tag not in ('翻译结果', '翻译请求'):
+                role_tag = None
+            content = html.escape(msg['content']).encode('utf-8', 'ignore').decode('utf-8')
+            parts.append(self._message_html(msg['role'], content, role_tag))
 
-        # 自动滚动并刷新界面
-        self.chat_history.ensureCursorVisible()
-        QApplication.processEvents()
+        cursor = self.chat_history.textCursor()
+        cursor.movePosition(QTextCursor.End)
+        cursor.insertHtml(''.join(parts))
+        if scroll_to_end:
+            self.chat_history.ensureCursorVisible()
+        else:
+            self.chat_history.verticalScrollBar().setValue(0)
+
+    def _count_earlier_messages(self, paper):
+        history = paper['chat_history']
+        if not history or 'id' not in history[0]:
+            return 0
+        return self.catalog.chat_count(paper['id'], before_id=history[0]['id'])
+
+    def on_chat_anchor_clicked(self, url):
+        if url.toString() == LOAD_EARLIER_URL:
+            self.load_earlier_messages()
+
+    def load_earlier_messages(self):
+        """向前加载一页聊天记录"""
+        # 回复生成中不重绘，避免打乱流式输出的插入位置
+        if not self.current_paper or self.chat_processing:
+            return
+        paper = self.current_paper
+        try:
+            earlier = self.catalog.get_chat(paper['id'], CHAT_TAIL_MESSAGES, before_id=paper['chat_history'][0]['id'])
+            paper['chat_history'] = earlier + paper['chat_history']
+            paper['chat_earlier'] = self._count_earlier_messages(paper)
+        except Exception as e:
+            print(f"加载聊天记录失败: {e}")
+            return
+        self.render_chat_history(scroll_to_end=False)
 
     def _append_thinking_message(self):
         """添加思考中的动画消息"""
@@ -1057,11 +1072,17 @@ class LiteratureManager(QMainWindow):
             self.chat_input.clear()
             
             # 启动工作线程
+            # 问题中仍包含框选文本时，一并检索选区所在段落
+            selection = self.chat_selection if self.chat_selection and self.chat_selection[1] in question else None
+            self.chat_selection = None
             worker = ChatWorker(
                 self.api_key,
-                self.current_paper['content_path'],
-                question
+                self.catalog.get_content(self.current_paper['id']),
+                question,
+                paper_path=self.current_paper['path'],
+                selection=selection
             )
+            worker.chunk_received.connect(self._append_stream_chunk)
             worker.response_received.connect(self._handle_success_response)
             worker.error_occurred.connect(self._handle_error_response)
             worker.finished.connect(self.on_chat_worker_finished)
@@ -1131,7 +1152,7 @@ class LiteratureManager(QMainWindow):
         """成功响应处理"""
         try:
             # 删除加载动画
-            self._remove_thinking_message()
+            self._end_pending_message()
             
             # 添加AI回复
             self._append_assistant_message(result['content'])
@@ -1145,7 +1166,7 @@ class LiteratureManager(QMainWindow):
     def _handle_error_response(self, error_msg):
         """错误处理"""
         try:
-            self._remove_thinking_message()
+            self._end_pending_message()
             self._append_system_message(f"请求失败：{error_msg}")
             QMessageBox.critical(self, "操作异常", error_msg)
         finally:
@@ -1153,6 +1174,32 @@ class LiteratureManager(QMainWindow):
             self.chat_processing = False  # 重置状态变量
             self._set_ui_interactive()
 
+    def _append_stream_chunk(self, text, role_tag=None):
+        """流式回复：首个片段到达时替换思考提示，之后直接追加纯文本"""
+        cursor = self.chat_history.textCursor()
+        if self.stream_start is None:
+            self._remove_thinking_message()
+            cursor.movePosition(QTextCursor.End)
+            self.stream_start = cursor.position()
+            label = "🌐 翻译结果" if role_tag == "翻译结果" else "🤖 assistant"
+            cursor.insertHtml(f"<p style='color: #388E3C; font-weight: 500;'>{label}</p>")
+            cursor.insertBlock()
+            cursor.setCharFormat(QTextCharFormat())
+        cursor.movePosition(QTextCursor.End)
+        cursor.insertText(text)
+        self.chat_history.ensureCursorVisible()
+
+    def _end_pending_message(self):
+        """结束等待中的回复：移除流式临时内容（完整回复随后按Markdown渲染），未开始流式输出时移除思考提示"""
+        if self.stream_start is None:
+            self._remove_thinking_message()
+            return
+        cursor = self.chat_history.textCursor()
+        cursor.setPosition(self.stream_start)
+        cursor.movePosition(QTextCursor.End, QTextCursor.KeepAnchor)
+        cursor.removeSelectedText()
+        self.stream_start = None
+
     def _remove_thinking_message(self):
         """改进的提示消息清除方法（主动添加换行）"""
         cursor = self.chat_history.textCursor()
@@ -1172,10 +1219,15 @@ class LiteratureManager(QMainWindow):
         dialog.set_api_key(self.api_key)
         if dialog.exec_() == QDialog.Accepted:
             self.api_key = dialog.get_api_key()
-            self.content['api_key'] = self.api_key
-            self.save_content()
+            self.import_pipeline.api_key = self.api_key
+            self.catalog.set_setting('api_key', self.api_key)
+            self.schedule_catalog_flush()
             self.update_status("API密钥已更新")
 
+    def show_api_stats(self):
+        QMessageBox.information(self, "API连接统计",
+                                get_client().format_stats() + "\n\n" + get_cache().format_stats())
+
     def check_api_key(self):
         return bool(self.api_key)
 
@@ -1184,10 +1236,16 @@ class LiteratureManager(QMainWindow):
 
     def closeEvent(self, event):
         # 先停止接受新请求
-        self.upload_queue.clear()
-        self.analysis_queue.clear()
-        
+        self.import_pipeline.stop()
+        self.workers.extend(self.import_pipeline.workers)
+        self.pending_index.clear()
+        if self.index_worker is not None:
+            self.workers.append(self.index_worker)
+
         # 终止所有工作线程
+        self.pdf_viewer.stop_search()
+        self.pdf_viewer.stop_text_index()
+        self.workers.extend(self.pdf_viewer.search_workers + self.pdf_viewer.index_workers)
         for worker in self.workers:
             if worker.isRunning():
                 worker.stop()  # 使用改进的stop方法
@@ -1201,6 +1259,8 @@ class LiteratureManager(QMainWindow):
         for worker in self.workers:
             if worker.isRunning():
                 worker.terminate()
-                
-        self.save_content()
+
+        shutdown_executor()
+        get_renderer().shutdown()
+        self.catalog.close()
         event.accept()
\ No newline at end of file
@@ -45,7 +45,6 @@ class NoteManagementWidget(QWidget):
     def load_notes(self):
         self.notes_list.clear()
         if self.current_paper:
-            self.parent.load_notes(self.current_paper)  # 加载笔记数据
             for note in self.current_paper.get('notes', []):
                 item = QListWidgetItem(f"P{note['page']+1}: {note['content'][:30]}")
                 item.setData(Qt.UserRole, note)
@@ -74,9 +73,8 @@ class NoteManagementWidget(QWidget):
             'content': content
         }
         
-        # 更新或添加笔记
-        self.current_paper['notes'].append(new_note)
-        self.parent.save_notes(self.current_paper)
+        # 添加笔记（单条写入文献库）
+        self.parent.add_note(self.current_paper, new_note)
         self.load_notes()
     
     def delete_note(self):
@@ -84,12 +82,13 @@ class NoteManagementWidget(QWidget):
         if not selected or not self.current_paper:
             return
         note = selected.data(Qt.UserRole)
-        self.current_paper['notes'] = [n for n in self.current_paper['notes'] if n['id'] != note['id']]
-        self.parent.save_notes(self.current_paper)
+        self.parent.delete_note(self.current_paper, note['id'])
         self.load_notes()
     
     def edit_note(self, item):
         note = item.data(Qt.UserRole)
         self.current_page = note['page']
         self.current_rect = fitz.Rect(note['rect']['x0'], note['rect']['y0'], note['rect']['x1'], note['rect']['y1'])
-        self.note_edit.setPlainText(note['content'])
\ No newline at end of file
+        self.note_edit.setPlainText(note['content'])
+        # 跳转到笔记所在页面
+        self.parent.pdf_viewer.go_to_page(note['page'])
\ No newline at end of file
@@ -1,26 +1,52 @@
 import fitz  # PyMuPDF
 from PyQt5.QtGui import QPainter, QPen, QBrush
 from PyQt5.QtWidgets import QLabel, QStyle
-from PyQt5.QtCore import Qt, QRect
+from PyQt5.QtCore import Qt, QRect, QRectF
 from PyQt5.QtGui import QColor
 
+# 覆盖层画刷与画笔只创建一次，重绘时直接复用
+NOTE_BRUSH = QBrush(QColor(255, 255, 0, 100))
+SEARCH_BRUSH = QBrush(QColor(255, 255, 0, 60))  # 更透明的黄色
+SEARCH_PEN = QPen(QColor(255, 255, 0, 150), 1, Qt.SolidLine)
+CURRENT_SEARCH_BRUSH = QBrush(QColor(255, 255, 0, 120))  # 半透明黄色
+CURRENT_SEARCH_PEN = QPen(QColor(255, 165, 0), 1, Qt.SolidLine)  # 橙色边框
+SELECTION_BRUSHES = {True: QBrush(QColor(101, 147, 245, 60)), False: QBrush(QColor(101, 147, 245, 20))}
+SELECTION_PENS = {True: QPen(QColor(33, 150, 243), 1, Qt.DashLine), False: QPen(QColor(33, 150, 243), 1, Qt.SolidLine)}
+NOTE_ICON_SIZE = 16
+
+
 class PDFDisplayLabel(QLabel):
     def __init__(self, parent):
         super().__init__(parent)
         self.parent_viewer = parent
+        self.note_icon = None  # 笔记图标，首次绘制时创建
+        # 按页分桶的笔记矩形（PDF坐标），笔记列表变化时重建
+        self.notes_source = None
+        self.notes_count = 0
+        self.notes_by_page = {}
 
     def paintEvent(self, event):
         super().paintEvent(event)
         painter = QPainter(self)
         painter.setRenderHint(QPainter.Antialiasing)
 
-        # 绘制搜索高亮
+        # 连续模式绘制可见页面，分块模式下绘制瓦片
         viewer = self.parent_viewer
+        if viewer.continuous:
+            self.draw_pages(painter, event.rect())
+        elif viewer.tile_mode:
+            self.draw_tiles(painter, event.rect())
+
+        # 只处理重绘区域内可见页面上的覆盖层
+        clip_rect = event.rect()
+        visible_pages = viewer.pages_in_rect(clip_rect) if viewer.continuous else (viewer.current_page,)
+
+        # 绘制搜索高亮
         if viewer.search_bar.isVisible():
-            for idx, result in enumerate(viewer.search_results):
-                if result["page"] == viewer.current_page:
-                    screen_rect = viewer.pdf_rect_to_screen(result["rect"], result["page"])
-                    if screen_rect.isValid():
+            for page_num in visible_pages:
+                for idx in viewer.search_pages.get(page_num, ()):
+                    screen_rect = viewer.pdf_rect_to_screen(viewer.search_results[idx]["rect"], page_num)
+                    if screen_rect.isValid() and screen_rect.intersects(clip_rect):
                         is_current = idx == viewer.current_search_index
                         self.draw_search_highlight(painter, screen_rect, is_current)
         
@@ -46,51 +72,83 @@ class PDFDisplayLabel(QLabel):
     
         # 安全校验
         if hasattr(main_window, 'current_paper') and main_window.current_paper:
-            notes = main_window.current_paper.get('notes', [])
-            current_page = self.parent_viewer.current_page
-            h_scroll = self.parent_viewer.scroll_area.horizontalScrollBar().value()
-            v_scroll = self.parent_viewer.scroll_area.verticalScrollBar().value()
-            
-            for note in notes:
-                if note['page'] == current_page:
-                    rect = fitz.Rect(note['rect']['x0'], note['rect']['y0'],
-                                    note['rect']['x1'], note['rect']['y1'])
-                    screen_rect = self.parent_viewer.pdf_rect_to_screen(rect, current_page)
-                    if screen_rect.isValid():
-                        # 调整滚动偏移
-                        adj_rect = screen_rect.translated(-h_scroll, -v_scroll)
+            notes_by_page = self.page_notes(main_window.current_paper.get('notes', []))
+            painter.setBrush(NOTE_BRUSH)
+            painter.setPen(Qt.NoPen)
+            for page_num in visible_pages:
+                for rect in notes_by_page.get(page_num, ()):
+                    screen_rect = viewer.pdf_rect_to_screen(rect, page_num)
+                    if screen_rect.isValid() and screen_rect.intersects(clip_rect):
+                        # 标签坐标已包含滚动位置，无需再偏移
                         # 绘制黄色高亮
-                        painter.setBrush(QBrush(QColor(255, 255, 0, 100)))
-                        painter.setPen(Qt.NoPen)
-                        painter.drawRect(adj_rect)
+                        painter.drawRect(screen_rect)
                         # 绘制笔记图标
-                        icon = self.style().standardIcon(QStyle.SP_FileDialogDetailedView)
-                        pixmap = icon.pixmap(16, 16)
-                        painter.drawPixmap(adj_rect.topLeft(), pixmap)
+                        painter.drawPixmap(screen_rect.topLeft(), self.get_note_icon())
+
+    def page_notes(self, notes):
+        """按页分桶的笔记矩形；笔记只会追加或整体替换，据此判断是否需要重建"""
+        if notes is not self.notes_source or len(notes) != self.notes_count:
+            self.notes_by_page = {}
+            for note in notes:
+                r = note['rect']
+                self.notes_by_page.setdefault(note['page'], []).append(fitz.Rect(r['x0'], r['y0'], r['x1'], r['y1']))
+            self.notes_source = notes
+            self.notes_count = len(notes)
+        return self.notes_by_page
+
+    def get_note_icon(self):
+        if self.note_icon is None:
+            icon = self.style().standardIcon(QStyle.SP_FileDialogDetailedView)
+            self.note_icon = icon.pixmap(NOTE_ICON_SIZE, NOTE_ICON_SIZE)
+        return self.note_icon
+
+    def draw_pages(self, painter, clip_rect):
+        """连续模式：只绘制与重绘区域相交的页面"""
+        viewer = self.parent_viewer
+        renderer = viewer.renderer
+        zoom = renderer.bucket_zoom(viewer.scale * 2)
+        painter.fillRect(clip_rect, QColor(240, 240, 240))  # 页间空隙
+        for page_num in viewer.pages_in_rect(clip_rect):
+            target = viewer.page_screen_rect(page_num)
+            painter.fillRect(target, Qt.white)
+            pixmap = renderer.get(renderer.make_key(viewer.file_path, page_num, zoom, viewer.rotation))
+            if pixmap is None:
+                # 缩放过程中先拉伸其他缩放级别的图像
+                pixmap = renderer.find_nearest(viewer.file_path, page_num, zoom, viewer.rotation)
+            if pixmap is not None:
+                painter.drawPixmap(target, pixmap)
+
+    def draw_tiles(self, painter, clip_rect):
+        """绘制与重绘区域相交的瓦片，缺失的瓦片用拉伸的低清底图代替"""
+        viewer = self.parent_viewer
+        base = None
+        for tile in viewer.tiles_in_rect(clip_rect):
+            target = viewer.tile_rect(*tile)
+            pixmap = viewer.renderer.get(viewer.tile_key(tile))
+            if pixmap is not None:
+                painter.drawPixmap(target, pixmap)
+                continue
+            if base is None:
+                base = viewer.renderer.get(viewer.base_key())
+                if base is None:
+                    continue
+                ratio = base.width() / max(1, self.minimumWidth())
+            source = QRectF(target.x() * ratio, target.y() * ratio,
+                            target.width() * ratio, target.height() * ratio)
+            painter.drawPixmap(QRectF(target), base, source)
 
     def draw_search_highlight(self, painter, rect, is_current):
         # 当前结果使用更明显的样式
-        if is_current:
-            fill_color = QColor(255, 255, 0, 120)  # 半透明黄色
-            border_color = QColor(255, 165, 0)     # 橙色边框
-        else:
-            fill_color = QColor(255, 255, 0, 60)   # 更透明的黄色
-            border_color = QColor(255, 255, 0, 150)
-        
-        painter.setBrush(QBrush(fill_color))
-        painter.setPen(QPen(border_color, 1, Qt.SolidLine))
+        painter.setBrush(CURRENT_SEARCH_BRUSH if is_current else SEARCH_BRUSH)
+        painter.setPen(CURRENT_SEARCH_PEN if is_current else SEARCH_PEN)
         painter.drawRoundedRect(rect, 2, 2)
 
     def draw_selection(self, painter, rect, is_active=True):
         """绘制选区（使用原始坐标）"""
-        fill_color = QColor(101, 147, 245)
-        fill_color.setAlpha(60 if is_active else 20)
-        
         painter.setPen(Qt.NoPen)
-        painter.setBrush(QBrush(fill_color))
+        painter.setBrush(SELECTION_BRUSHES[is_active])
         painter.drawRoundedRect(rect, 3, 3)
 
-        border_color = QColor(33, 150, 243)
-        painter.setPen(QPen(border_color, 1, Qt.DashLine if is_active else Qt.SolidLine))
+        painter.setPen(SELECTION_PENS[is_active])
         painter.setBrush(Qt.NoBrush)
         painter.drawRoundedRect(rect, 3, 3)
\ No newline at end of file
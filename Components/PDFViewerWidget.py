@@ -1,16 +1,24 @@
 import time
+import bisect
 import fitz  # PyMuPDF
-from PyQt5.QtGui import QImage, QPixmap, QCursor, QPalette
+from PyQt5.QtGui import QCursor, QPalette
 from PyQt5.QtWidgets import (QApplication, QWidget, QVBoxLayout, QHBoxLayout, 
                              QStyle, QLabel, QPushButton, QScrollArea, QMessageBox,
                             QLineEdit, QMenu)
-from PyQt5.QtCore import Qt, pyqtSignal, QPoint, QRect, QTimer
-from PyQt5.QtGui import QColor, QPixmap
+from PyQt5.QtCore import Qt, pyqtSignal, QPoint, QRect, QSize, QTimer
+from PyQt5.QtGui import QColor
 from Components.PDFDisplayLable import PDFDisplayLabel
+from Workers.SearchWorker import SearchWorker
+from Workers.TextIndexWorker import TextIndexWorker
+from Utils.PageRenderer import PageRenderer
+from Utils.FitzLock import FITZ_LOCK
+from Config.Config import (PREFETCH_PAGES, TILE_BASE_ZOOM, TILE_SIZE, TILE_THRESHOLD_PIXELS,
+                           CONTINUOUS_PAGE_GAP, CONTINUOUS_MARGIN_PAGES, CONTINUOUS_KEEP_PAGES)
 
 class PDFViewerWidget(QWidget):
     page_changed = pyqtSignal(int)
     text_selected = pyqtSignal(str)
+    selection_asked = pyqtSignal(int, str)  # 提问时的选区 (页码, 文本)，用于检索所在段落
     selection_cleared = pyqtSignal()
     note_add_requested = pyqtSignal(int, object)  # 页码和fitz.Rect
     translate_requested = pyqtSignal(str)  # 翻译信号
@@ -18,13 +26,30 @@ class PDFViewerWidget(QWidget):
     def __init__(self, parent=None):
         super().__init__(parent)
         self.doc = None
+        self.file_path = None
+        self.page_rects = []  # 各页尺寸（PDF坐标），打开文档时一次读出，界面线程之后不再调用fitz
+        self.page_count = 0
         self.current_page = 0
         self.scale = 1.0
+        self.rotation = 0
         self.selected_rects = []
         self.active_selection = None
         self.hovered_selection = None
         self.last_hover_time = 0
 
+        # 后台渲染与页面缓存
+        self.renderer = PageRenderer(self)
+        self.renderer.page_ready.connect(self.on_page_ready)
+        self.current_render_key = None
+        self.page_direction = 1  # 最近一次翻页方向，用于预取排序
+        self.tile_mode = False  # 高倍缩放时按视口分块渲染
+        self.tile_zoom = 1.0
+        self.requested_tiles = set()
+        self.continuous = False  # 连续滚动模式，只渲染可见页面
+        self.page_offsets = []  # 连续模式下各页顶部在标签上的y坐标
+        self.layout_zoom = 1.0
+        self.requested_pages = set()
+
         # 初始化核心显示组件
         self.image_label = PDFDisplayLabel(self)
         self.image_label.setAlignment(Qt.AlignTop | Qt.AlignLeft)
@@ -32,6 +57,8 @@ class PDFViewerWidget(QWidget):
         self.scroll_area = QScrollArea()
         self.scroll_area.setWidget(self.image_label)
         self.scroll_area.setWidgetResizable(True)
+        self.scroll_area.horizontalScrollBar().valueChanged.connect(self.on_scroll)
+        self.scroll_area.verticalScrollBar().valueChanged.connect(self.on_scroll)
 
         # 搜索功能组件
         self.search_bar = QWidget()
@@ -89,9 +116,19 @@ class PDFViewerWidget(QWidget):
         search_icon = self.style().standardIcon(QStyle.SP_FileDialogContentsView)
         self.search_icon.setIcon(search_icon)
 
+        # 连续滚动模式切换按钮
+        self.continuous_btn = QPushButton()
+        self.continuous_btn.setObjectName("viewModeBtn")
+        self.continuous_btn.setCheckable(True)
+        self.continuous_btn.setCursor(Qt.PointingHandCursor)
+        self.continuous_btn.setToolTip("连续滚动模式")
+        self.continuous_btn.setIcon(self.style().standardIcon(QStyle.SP_ToolBarVerticalExtensionButton))
+        self.continuous_btn.toggled.connect(self.set_continuous)
+
         # 标题栏布局组装
         title_layout.addWidget(self.title_label)
         title_layout.addStretch()
+        title_layout.addWidget(self.continuous_btn)
         title_layout.addWidget(self.search_icon)
 
         # 搜索框布局组装
@@ -106,6 +143,16 @@ class PDFViewerWidget(QWidget):
         self.search_timer.setInterval(300)  # 300毫秒延迟
         self.search_timer.timeout.connect(self.perform_search)
 
+        # 缩放/窗口调整停止后才进行全分辨率渲染
+        self.zoom_timer = QTimer(self)
+        self.zoom_timer.setSingleShot(True)
+        self.zoom_timer.setInterval(150)
+        self.zoom_timer.timeout.connect(self.show_page)
+        self.resize_timer = QTimer(self)
+        self.resize_timer.setSingleShot(True)
+        self.resize_timer.setInterval(120)
+        self.resize_timer.timeout.connect(self.show_page)
+
         # 主布局
         main_layout = QVBoxLayout(self)
         main_layout.setContentsMargins(0, 0, 0, 0)
@@ -138,7 +185,12 @@ class PDFViewerWidget(QWidget):
         self.hover_timer.start()
 
         self.search_results = []
+        self.search_pages = {}  # 页码 -> 该页搜索结果在search_results中的下标，绘制时只遍历可见页
         self.current_search_index = -1
+        self.search_worker = None  # 当前后台搜索
+        self.search_workers = []  # 保留引用直到线程结束
+        self.text_index = None  # 文档单词索引，就绪后搜索与框选不再解析页面
+        self.index_workers = []
 
         # 信号连接
         self.search_input.textChanged.connect(self.start_search_timer)
@@ -167,6 +219,7 @@ class PDFViewerWidget(QWidget):
 
     def start_search_timer(self):
         self.search_timer.stop()  # 每次输入都重置定时器
+        self.stop_search()  # 查询变化时立即取消进行中的搜索
         self.search_timer.start()
 
     def emit_translation_request(self):
@@ -178,8 +231,8 @@ class PDFViewerWidget(QWidget):
     def trigger_add_note(self):
         if self.selected_rects:
             selection = self.selected_rects[-1]
-            page = self.current_page
-            pdf_rect = self.screen_to_pdf(selection['rect'])
+            page = selection['page']
+            pdf_rect = self.screen_to_pdf(selection['rect'], page)
             self.note_add_requested.emit(page, pdf_rect)
             self.clear_selections()
 
@@ -202,7 +255,7 @@ class PDFViewerWidget(QWidget):
             self.clear_search()
             
         # 自动滚动到可视区域
-        if visible and self.doc:
+        if visible and self.doc is not None:
             self.scroll_area.ensureVisible(0, 0)
 
     def keyPressEvent(self, event):
@@ -218,41 +271,91 @@ class PDFViewerWidget(QWidget):
     def perform_search(self):
         # 停止定时器防止重复触发
         self.search_timer.stop()
+        self.stop_search()
 
         search_text = self.search_input.text().strip()
         if not search_text:
             self.clear_search()
             return
+        if self.doc is None:
+            return
 
-        self.search_results.clear()
-        self.current_search_index = -1
-        
-        for page_num in range(len(self.doc)):
-            page = self.doc.load_page(page_num)
-            text_instances = page.search_for(search_text)
-            
-            for rect in text_instances:
-                self.search_results.append({
-                    "page": page_num,
-                    "rect": rect,
-                    "screen_rect": self.pdf_rect_to_screen(rect, page_num)
-                })
-        
-        if self.search_results:
+        self.reset_search_results()
+
+        if self.text_index:
+            # 索引已就绪时直接在内存中查找
+            for page_num, rects in self.text_index.search(search_text):
+                self.add_search_results(page_num, rects)
+            if self.search_results:
+                self.current_search_index = 0
+                self.highlight_current_search()
+            self.update_match_label()
+            self.image_label.update()
+            return
+
+        # 在后台线程逐页搜索，结果按页流式返回
+        worker = SearchWorker(self.file_path, search_text)
+        worker.page_results.connect(self.on_search_page_results)
+        worker.search_finished.connect(self.on_search_finished)
+        worker.error_occurred.connect(lambda error: print(error))
+        worker.finished.connect(self.on_search_worker_finished)
+        self.search_worker = worker
+        self.search_workers.append(worker)
+        worker.start()
+        self.update_match_label()
+        self.image_label.update()
+
+    def stop_search(self):
+        """取消进行中的搜索（线程在下一页前退出）"""
+        if self.search_worker:
+            self.search_worker.stop()
+            self.search_worker = None
+
+    def on_search_page_results(self, page_num, rects):
+        if self.sender() is not self.search_worker:
+            return  # 已取消的搜索
+        self.add_search_results(page_num, rects)
+        if self.current_search_index < 0:
+            # 第一批结果到达时立即跳转
             self.current_search_index = 0
             self.highlight_current_search()
         self.update_match_label()
         self.image_label.update()
 
+    def reset_search_results(self):
+        self.search_results.clear()
+        self.search_pages.clear()
+        self.current_search_index = -1
+
+    def add_search_results(self, page_num, rects):
+        indices = self.search_pages.setdefault(page_num, [])
+        for rect in rects:
+            indices.append(len(self.search_results))
+            self.search_results.append({
+                "page": page_num,
+                "rect": rect,
+                "screen_rect": self.pdf_rect_to_screen(rect, page_num)
+            })
+
+    def on_search_finished(self, total):
+        if self.sender() is not self.search_worker:
+            return
+        self.search_worker = None
+        self.update_match_label()
+
+    def on_search_worker_finished(self):
+        self.search_workers = [w for w in self.search_workers if w.isRunning()]
+
     def pdf_rect_to_screen(self, rect, page_num):
         """将PDF坐标转换为当前屏幕坐标"""
-        if page_num != self.current_page:
+        if not self.continuous and page_num != self.current_page:
             return QRect()
             
         zoom = self.scale * 2
+        origin = self.page_origin(page_num)
         return QRect(
-            int(rect.x0 * zoom),
-            int(rect.y0 * zoom),
+            int(rect.x0 * zoom) + origin.x(),
+            int(rect.y0 * zoom) + origin.y(),
             int((rect.x1 - rect.x0) * zoom),
             int((rect.y1 - rect.y0) * zoom)
         )
@@ -265,9 +368,7 @@ class PDFViewerWidget(QWidget):
         
         # 切换到对应页面
         if result["page"] != self.current_page:
-            self.current_page = result["page"]
-            self.show_page()
-            self.page_changed.emit(self.current_page)
+            self.go_to_page(result["page"])
             
         # 滚动到可见区域
         screen_rect = self.pdf_rect_to_screen(result["rect"], result["page"])
@@ -293,16 +394,19 @@ class PDFViewerWidget(QWidget):
 
     def update_match_label(self):
         count = len(self.search_results)
+        searching = self.search_worker is not None
         if count == 0:
-            self.match_label.setText("无匹配")
+            self.match_label.setText("搜索中..." if searching else "无匹配")
         else:
-            self.match_label.setText(f"{self.current_search_index+1}/{count}")
+            # 搜索未完成时总数后加"+"
+            suffix = "+" if searching else ""
+            self.match_label.setText(f"{self.current_search_index+1}/{count}{suffix}")
 
     def clear_search(self):
         """清空搜索内容"""
+        self.stop_search()
         self.search_input.clear()
-        self.search_results.clear()
-        self.current_search_index = -1
+        self.reset_search_results()
         self.match_label.setText("0/0")
         self.image_label.update()
 
@@ -314,48 +418,371 @@ class PDFViewerWidget(QWidget):
     def load_pdf(self, file_path):
         """加载PDF文档"""
         try:
-            self.doc = fitz.open(file_path)
+            self.stop_search()
+            self.stop_text_index()
+            self.reset_search_results()
+            self.renderer.cancel_prefetch()
+            if self.file_path:
+                self.renderer.clear_document(self.file_path)
+            self.close_document()
+            if file_path is None:
+                # 没有要显示的文献（如当前文献已被删除）：只清空视图，不打开文档也不建立索引
+                self.file_path = None
+                self.current_render_key = None
+                self.page_offsets = []
+                self.requested_pages = set()
+                self.current_page = 0
+                self.selected_rects.clear()
+                self.image_label.clear()
+                return
+            with FITZ_LOCK:
+                self.doc = fitz.open(file_path)
+                self.page_rects = [page.rect for page in self.doc]
+            self.file_path = file_path
+            self.page_offsets = []
+            self.requested_pages = set()
             self.current_page = 0
-            self.page_count = len(self.doc)  # 新增总页数保存
+            self.page_count = len(self.page_rects)  # 新增总页数保存
+            self.start_text_index()
             self.selected_rects.clear()
             self.show_page()
         except Exception as e:
             QMessageBox.critical(self, "错误", f"无法打开PDF文件：{str(e)}")
-            self.doc = None  # 确保加载失败时重置doc
+            self.close_document()  # 确保加载失败时重置doc
+            self.file_path = None
+            self.current_render_key = None
             self.current_page = 0
             self.selected_rects.clear()
             self.image_label.clear()
 
+    def start_text_index(self):
+        """后台加载或构建单词索引"""
+        worker = TextIndexWorker(self.file_path)
+        worker.index_ready.connect(self.on_text_index_ready)
+        worker.error_occurred.connect(lambda error: print(error))
+        worker.finished.connect(self.on_index_worker_finished)
+        self.index_workers.append(worker)
+        worker.start()
+
+    def stop_text_index(self):
+        self.text_index = None
+        for worker in self.index_workers:
+            worker.stop()
+
+    def on_text_index_ready(self, file_path, index):
+        if file_path == self.file_path:
+            self.text_index = index
+
+    def on_index_worker_finished(self):
+        self.index_workers = [w for w in self.index_workers if w.isRunning()]
+
+    def close_document(self):
+        if self.doc is not None:
+            with FITZ_LOCK:
+                self.doc.close()
+        self.doc = None
+        self.page_rects = []
+        self.page_count = 0
+
+    def page_rect(self, page_num):
+        """页面尺寸（PDF坐标）"""
+        return self.page_rects[page_num]
+
+    def fit_scale(self):
+        """按视口大小计算自动缩放比例"""
+        if self.continuous:
+            # 连续模式按最宽页面适配视口宽度
+            max_width = max(self.page_rect(i).width for i in range(self.page_count))
+            self.scale = self.scroll_area.viewport().width() / max_width / 2
+            return
+        page_rect = self.page_rect(self.current_page)
+        scale_x = self.scroll_area.width() / page_rect.width
+        scale_y = self.scroll_area.height() / page_rect.height
+        self.scale = min(scale_x, scale_y) / 2  # 保持高清渲染
+
     def show_page(self):
-        """精确渲染页面"""
-        if not self.doc:
+        """精确渲染页面（后台渲染，命中缓存时立即显示）"""
+        if self.doc is None:
             return
+        self.zoom_timer.stop()
+        self.resize_timer.stop()
 
-        page = self.doc.load_page(self.current_page)
-        page_rect = page.rect
-        
         # 仅在自动缩放模式下计算缩放比例
         if self.auto_scale:  # 新增条件判断
-            scale_x = self.scroll_area.width() / page_rect.width
-            scale_y = self.scroll_area.height() / page_rect.height
-            self.scale = min(scale_x, scale_y) / 2  # 保持高清渲染
-        
-        # 生成高质量图像
-        mat = fitz.Matrix(self.scale * 2, self.scale * 2)
-        pix = page.get_pixmap(matrix=mat, alpha=False)
-        
-        # 转换为Qt图像并居中显示
-        img = QImage(
-            pix.samples, pix.width, pix.height,
-            pix.stride, QImage.Format_RGB888
-        ).rgbSwapped()
-        
-        self.image_label.setPixmap(QPixmap.fromImage(img))
+            self.fit_scale()
+
+        # 对齐缩放档位，保证坐标换算与缓存图像一致
+        zoom = self.renderer.bucket_zoom(self.scale * 2)
+        self.scale = zoom / 2
+
+        if self.continuous:
+            self.show_continuous()
+            return
+
+        if self.needs_tiles(self.current_page, zoom):
+            # 高倍缩放时只渲染视口内的瓦片
+            self.current_render_key = None
+            self.display_tiles(zoom)
+            self.request_visible_tiles()
+        else:
+            key = self.renderer.make_key(self.file_path, self.current_page, zoom, self.rotation)
+            self.current_render_key = key
+            pixmap = self.renderer.get(key)
+            if pixmap is not None:
+                self.display_pixmap(pixmap)
+            else:
+                # 先显示拉伸的低清图像，清晰版本渲染完成后替换
+                self.show_preview()
+                self.renderer.request(key)
+        self.prefetch_neighbours(zoom)
+
+    def show_preview(self):
+        """将已缓存的同页图像拉伸到当前缩放，作为即时预览"""
+        zoom = self.scale * 2
+        if self.continuous:
+            # 只重新排版，绘制时拉伸已有图像
+            self.show_continuous(request=False)
+            return
+        if self.needs_tiles(self.current_page, zoom):
+            # 分块模式在绘制时直接拉伸底图，不再分配整页图像
+            self.display_tiles(zoom)
+            return
+        source = self.renderer.find_nearest(self.file_path, self.current_page, zoom, self.rotation)
+        if source is None:
+            return
+        size = self.page_pixel_size(self.current_page, zoom)
+        if source.size() != size:
+            source = source.scaled(size, Qt.IgnoreAspectRatio, Qt.FastTransformation)
+        self.display_pixmap(source)
+
+    def page_pixel_size(self, page_num, zoom):
+        page_rect = self.page_rect(page_num)
+        return QSize(max(1, int(page_rect.width * zoom)), max(1, int(page_rect.height * zoom)))
+
+    def needs_tiles(self, page_num, zoom):
+        size = self.page_pixel_size(page_num, zoom)
+        return size.width() * size.height() > TILE_THRESHOLD_PIXELS
+
+    def prefetch_neighbours(self, zoom):
+        """低优先级预渲染前后页面，翻页方向上的页面优先"""
+        keys = []
+        for distance in range(1, PREFETCH_PAGES + 1):
+            for page_num in (self.current_page + distance * self.page_direction,
+                             self.current_page - distance * self.page_direction):
+                if 0 <= page_num < self.page_count:
+                    # 需要分块的页面只预取低清底图
+                    page_zoom = TILE_BASE_ZOOM if self.needs_tiles(page_num, zoom) else zoom
+                    keys.append(self.renderer.make_key(self.file_path, page_num, page_zoom, self.rotation))
+        self.renderer.prefetch(keys)
+
+    def go_to_page(self, page_num):
+        """跳转到指定页面（搜索、笔记等非连续跳转会撤销原有预取）"""
+        if self.doc is None or not 0 <= page_num < self.page_count or page_num == self.current_page:
+            return
+        self.renderer.cancel_prefetch()
+        self.current_page = page_num
+        if self.continuous:
+            self.scroll_area.verticalScrollBar().setValue(self.page_offsets[page_num])
+        else:
+            self.show_page()
+        self.page_changed.emit(self.current_page)
+
+    def on_page_ready(self, key):
+        """后台渲染完成，仅显示仍然需要的页面"""
+        if key == self.current_render_key:
+            pixmap = self.renderer.get(key)
+            if pixmap is not None:
+                self.display_pixmap(pixmap)
+        elif self.continuous and key[0] == self.file_path and key[4] is None:
+            if key[1] < len(self.page_offsets):
+                self.image_label.update(self.page_screen_rect(key[1]))
+        elif self.tile_mode and key[0] == self.file_path and key[1] == self.current_page:
+            # 瓦片或底图到达，重绘对应区域
+            tile = key[4]
+            if tile is not None and key[2] == self.tile_zoom:
+                self.image_label.update(self.tile_rect(*tile))
+            elif tile is None:
+                self.image_label.update()
+
+    def display_pixmap(self, pixmap):
+        self.tile_mode = False
+        self.withdraw_tiles()
+        self.image_label.setMinimumSize(0, 0)
+        self.image_label.setPixmap(pixmap)
         self.image_label.adjustSize()
 
+    def on_scroll(self):
+        if self.continuous:
+            self.update_visible_pages()
+        else:
+            self.request_visible_tiles()
+
+    # 连续滚动
+    def set_continuous(self, enabled):
+        """切换单页/连续滚动模式"""
+        if enabled == self.continuous:
+            return
+        self.continuous = enabled
+        self.auto_scale = True
+        self.active_selection = None
+        self.clear_selections()
+        self.withdraw_tiles()
+        self.renderer.withdraw(self.requested_pages)
+        self.requested_pages = set()
+        self.current_render_key = None
+        self.tile_mode = False
+        if self.doc is not None:
+            page_num = self.current_page
+            self.show_page()
+            if enabled:
+                self.scroll_area.verticalScrollBar().setValue(self.page_offsets[page_num])
+
+    def page_origin(self, page_num):
+        """页面左上角在标签上的位置"""
+        if self.continuous and page_num < len(self.page_offsets):
+            return QPoint(0, self.page_offsets[page_num])
+        return QPoint(0, 0)
+
+    def page_screen_rect(self, page_num):
+        size = self.page_pixel_size(page_num, self.scale * 2)
+        return QRect(self.page_origin(page_num), size)
+
+    def page_at(self, y):
+        """连续模式下y坐标所在（或之前最近）的页码"""
+        return max(0, bisect.bisect_right(self.page_offsets, y) - 1)
+
+    def pages_in_rect(self, rect):
+        if not self.page_offsets:
+            return range(0)
+        return range(self.page_at(rect.top()), self.page_at(rect.bottom()) + 1)
+
+    def layout_pages(self):
+        """按当前缩放计算所有页面的纵向位置，返回标签尺寸"""
+        zoom = self.scale * 2
+        offsets = []
+        y = 0
+        width = 0
+        for page_num in range(self.page_count):
+            size = self.page_pixel_size(page_num, zoom)
+            offsets.append(y)
+            y += size.height() + CONTINUOUS_PAGE_GAP
+            width = max(width, size.width())
+        self.page_offsets = offsets
+        self.layout_zoom = zoom
+        return QSize(width, max(1, y - CONTINUOUS_PAGE_GAP))
+
+    def show_continuous(self, request=True):
+        """重新排版连续视图，并保持当前阅读位置"""
+        scrollbar = self.scroll_area.verticalScrollBar()
+        anchor_page = self.current_page
+        fraction = 0.0
+        if anchor_page < len(self.page_offsets):
+            old_height = self.page_pixel_size(anchor_page, self.layout_zoom).height()
+            fraction = (scrollbar.value() - self.page_offsets[anchor_page]) / old_height
+
+        self.image_label.clear()
+        size = self.layout_pages()
+        self.image_label.setMinimumSize(size)
+        self.image_label.resize(size)
+        new_rect = self.page_screen_rect(anchor_page)
+        scrollbar.setValue(new_rect.top() + int(fraction * new_rect.height()))
+        if request:
+            self.update_visible_pages()
+        self.image_label.update()
+
+    def update_visible_pages(self):
+        """请求可见页面及少量边缘页面，淘汰远离视口的页面图像"""
+        if not self.continuous or self.doc is None or not self.page_offsets:
+            return
+        top = self.scroll_area.verticalScrollBar().value()
+        viewport = QRect(0, top, self.image_label.width(), self.scroll_area.viewport().height())
+        visible = self.pages_in_rect(viewport)
+
+        # 以视口中心所在页作为当前页
+        center = self.page_at(viewport.center().y())
+        if center != self.current_page:
+            self.current_page = center
+            self.page_changed.emit(center)
+
+        zoom = self.renderer.bucket_zoom(self.scale * 2)
+        first = max(0, visible.start - CONTINUOUS_MARGIN_PAGES)
+        last = min(self.page_count, visible.stop + CONTINUOUS_MARGIN_PAGES)
+        keys = {}
+        for page_num in range(first, last):
+            keys[page_num] = self.renderer.make_key(self.file_path, page_num, zoom, self.rotation)
+        self.renderer.withdraw(self.requested_pages - set(keys.values()))
+        for page_num in visible:
+            self.renderer.request(keys[page_num])
+        self.renderer.prefetch([key for page_num, key in keys.items() if page_num not in visible])
+        self.requested_pages = set(keys.values())
+
+        # 释放远离视口的页面，内存只与可见页数相关
+        file_path = self.file_path
+        self.renderer.cache.discard_where(
+            lambda key: key[0] == file_path and key[4] is None
+            and not first - CONTINUOUS_KEEP_PAGES <= key[1] < last + CONTINUOUS_KEEP_PAGES)
+
+    # 分块渲染
+    def display_tiles(self, zoom):
+        """切换到分块显示：标签只占位，由paintEvent绘制瓦片"""
+        if not self.tile_mode:
+            self.image_label.clear()
+        self.tile_mode = True
+        self.tile_zoom = zoom
+        size = self.page_pixel_size(self.current_page, zoom)
+        self.image_label.setMinimumSize(size)
+        self.image_label.resize(size)
+        self.image_label.update()
+
+    def tile_rect(self, col, row):
+        """瓦片在标签上的像素区域（裁剪到页面边界）"""
+        size = self.page_pixel_size(self.current_page, self.tile_zoom)
+        return QRect(col * TILE_SIZE, row * TILE_SIZE, TILE_SIZE, TILE_SIZE).intersected(
+            QRect(0, 0, size.width(), size.height()))
+
+    def tiles_in_rect(self, rect):
+        """返回与给定区域相交的瓦片 (列, 行) 列表"""
+        size = self.page_pixel_size(self.current_page, self.tile_zoom)
+        rect = rect.intersected(QRect(0, 0, size.width(), size.height()))
+        if rect.isEmpty():
+            return []
+        return [(col, row)
+                for row in range(rect.top() // TILE_SIZE, rect.bottom() // TILE_SIZE + 1)
+                for col in range(rect.left() // TILE_SIZE, rect.right() // TILE_SIZE + 1)]
+
+    def tile_key(self, tile):
+        return self.renderer.make_key(self.file_path, self.current_page, self.tile_zoom, self.rotation, tile)
+
+    def base_key(self):
+        """分块模式下用作占位的低清整页图像"""
+        zoom = self.renderer.bucket_zoom(min(TILE_BASE_ZOOM, self.tile_zoom))
+        return self.renderer.make_key(self.file_path, self.current_page, zoom, self.rotation)
+
+    def request_visible_tiles(self):
+        """请求视口（外扩一个瓦片）内的瓦片，撤销已滚出视口的请求"""
+        if not self.tile_mode or self.doc is None:
+            return
+        viewport = self.scroll_area.viewport()
+        visible = QRect(
+            self.scroll_area.horizontalScrollBar().value(),
+            self.scroll_area.verticalScrollBar().value(),
+            viewport.width(), viewport.height()
+        ).adjusted(-TILE_SIZE, -TILE_SIZE, TILE_SIZE, TILE_SIZE)
+
+        self.renderer.request(self.base_key())
+        keys = {self.tile_key(tile) for tile in self.tiles_in_rect(visible)}
+        self.renderer.withdraw(self.requested_tiles - keys)
+        for key in keys:
+            self.renderer.request(key)
+        self.requested_tiles = keys
+
+    def withdraw_tiles(self):
+        self.renderer.withdraw(self.requested_tiles)
+        self.requested_tiles = set()
+
     # 事件处理逻辑
     def mousePressEvent(self, event):
-        if not self.doc:
+        if self.doc is None:
             return
         if event.button() == Qt.LeftButton:
             self.start_selection(event.pos())
@@ -363,20 +790,21 @@ class PDFViewerWidget(QWidget):
             self.show_context_menu(event.pos())
 
     def mouseMoveEvent(self, event):
-        if self.active_selection and self.doc:
+        if self.active_selection and self.doc is not None:
             self.update_selection(event.pos())
 
     def mouseReleaseEvent(self, event):
-        if self.doc and event.button() == Qt.LeftButton and self.active_selection:
+        if self.doc is not None and event.button() == Qt.LeftButton and self.active_selection:
             self.finalize_selection()
 
     # 选区管理逻辑
     def start_selection(self, pos):
         """开始新的选区"""
+        label_pos = self.map_to_label(pos)
         self.active_selection = {
-            "start": self.map_to_label(pos),
-            "current": self.map_to_label(pos),
-            "page": self.current_page
+            "start": label_pos,
+            "current": label_pos,
+            "page": self.page_at(label_pos.y()) if self.continuous else self.current_page
         }
         self.image_label.update()
 
@@ -389,7 +817,8 @@ class PDFViewerWidget(QWidget):
     def finalize_selection(self):
         try:
             # 检查文档和页码有效性
-            if not self.doc or self.current_page < 0 or self.current_page >= len(self.doc):
+            page_num = self.active_selection["page"]
+            if self.doc is None or page_num < 0 or page_num >= self.page_count:
                 print("文档未加载或当前页码无效")
                 self.active_selection = None
                 return
@@ -399,17 +828,22 @@ class PDFViewerWidget(QWidget):
             
             # 计算规范化矩形
             rect = self.normalize_rect(start, end)
-            pdf_rect = self.screen_to_pdf(rect)
+            pdf_rect = self.screen_to_pdf(rect, page_num)
             
             # 提取文本
-            page = self.doc[self.current_page]
-            # 使用"words"模式获取选区内的单词列表
-            words = page.get_text("words", clip=pdf_rect)
-            # 拼接所有单词的文本内容
-            text = ' '.join(word[4] for word in words).strip()
+            if self.text_index:
+                # 从单词索引中查找，无需重新解析页面
+                text = self.text_index.selection_text(page_num, pdf_rect)
+            else:
+                # 使用"words"模式获取选区内的单词列表
+                with FITZ_LOCK:
+                    words = self.doc[page_num].get_text("words", clip=pdf_rect)
+                # 拼接所有单词的文本内容
+                text = ' '.join(word[4] for word in words).strip()
             if text:
                 self.selected_rects = [{
                     "rect": rect,
+                    "page": page_num,
                     "text": text,
                     "timestamp": time.time()
                 }]
@@ -430,9 +864,11 @@ class PDFViewerWidget(QWidget):
         # 计算实际标签坐标
         return QPoint(pos_in_viewport.x() + h_scroll, pos_in_viewport.y() + v_scroll)
 
-    def screen_to_pdf(self, rect):
+    def screen_to_pdf(self, rect, page_num=None):
         """屏幕坐标转PDF坐标"""
         scale = self.scale * 2
+        origin = self.page_origin(self.current_page if page_num is None else page_num)
+        rect = rect.translated(-origin)
         return fitz.Rect(
             rect.left() / scale,
             rect.top() / scale,
@@ -489,6 +925,7 @@ class PDFViewerWidget(QWidget):
         if self.selected_rects:
             # 添加两个换行符
             modified_text = "\n\n" + self.selected_rects[-1]["text"]
+            self.selection_asked.emit(self.selected_rects[-1]["page"], self.selected_rects[-1]["text"])
             self.text_selected.emit(modified_text)
             
             # 跳转到智能问答窗口
@@ -508,16 +945,24 @@ class PDFViewerWidget(QWidget):
             delta = event.angleDelta().y()
             self.scale *= 1.1 if delta > 0 else 0.9
             self.scale = max(0.5, min(self.scale, 5.0))
-            self.show_page()
+            # 连续缩放时只拉伸预览，停顿后再渲染
+            self.current_render_key = None
+            self.show_preview()
+            self.zoom_timer.start()
             event.accept()
+        elif self.continuous or self.doc is None:
+            # 连续模式由滚动区域负责滚动
+            event.ignore()
         else:
             # 翻页时保持当前缩放模式
             delta = event.angleDelta().y()
-            if delta < 0 and self.current_page < len(self.doc) - 1:
+            if delta < 0 and self.current_page < self.page_count - 1:
+                self.page_direction = 1
                 self.current_page += 1
                 self.show_page()
                 self.page_changed.emit(self.current_page)
             elif delta > 0 and self.current_page > 0:
+                self.page_direction = -1
                 self.current_page -= 1
                 self.show_page()
                 self.page_changed.emit(self.current_page)
@@ -526,5 +971,10 @@ class PDFViewerWidget(QWidget):
     def resizeEvent(self, event):
         """窗口大小改变时恢复自动缩放"""
         self.auto_scale = True  # 新增resize事件处理
-        self.show_page()
+        # 合并连续的resize事件，只渲染最终尺寸
+        if self.doc is not None:
+            self.current_render_key = None
+            self.fit_scale()
+            self.show_preview()
+            self.resize_timer.start()
         super().resizeEvent(event)
\ No newline at end of file
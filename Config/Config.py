@@ -1,3 +1,49 @@
-CONTENT_FILE = "Content/content.json"
+import os
+
+CONTENT_FILE = "Content/content.json"  # 旧版文献库，仅用于迁移
+CATALOG_FILE = "Content/library.db"  # 文献库目录（SQLite）
 ANALYSIS_DIR = "AnalysisResults"
-MOONSHOT_API = "https://api.moonshot.cn/v1"
\ No newline at end of file
+MOONSHOT_API = "https://api.moonshot.cn/v1"
+
+# PDF渲染配置
+RENDER_CACHE_MB = 256  # 页面图像缓存上限（MB）
+RENDER_THREADS = 1  # 后台渲染线程数；PyMuPDF非线程安全，光栅化在FITZ_LOCK下串行，增加线程不会并行渲染
+RENDER_ZOOM_STEP = 0.05  # 缩放分档步长，同一档位复用缓存
+PREFETCH_PAGES = 2  # 预渲染当前页前后各k页
+TILE_THRESHOLD_PIXELS = 4_000_000  # 整页像素超过该值时改为分块渲染
+TILE_SIZE = 512  # 瓦片边长（像素）
+TILE_BASE_ZOOM = 1.0  # 分块模式下低清底图的缩放
+CONTINUOUS_PAGE_GAP = 8  # 连续滚动模式下页面间距（像素）
+CONTINUOUS_MARGIN_PAGES = 1  # 视口外额外渲染的页数
+CONTINUOUS_KEEP_PAGES = 4  # 超出该距离的页面图像被释放
+LIBRARY_INDEX_FILE = "AnalysisResults/library_index.db"  # 全文检索索引
+
+# API连接配置
+API_POOL_SIZE = 8  # 连接池大小（同时保持的keep-alive连接数）
+API_CONNECT_TIMEOUT = 10  # 建立连接超时（秒）
+API_READ_TIMEOUT = 60  # 默认读取超时（秒）
+API_REQUESTS_PER_MIN = 60  # 全局请求速率上限（按账户等级调整）
+API_TOKENS_PER_MIN = 256000  # 全局token速率上限（输入估算 + 输出上限）
+API_DEFAULT_RETRY_AFTER = 20  # 429响应未给出Retry-After时的暂停秒数
+REFINE_SPLIT_TOKENS = 48000  # 裁剪后原文估算超过该token数时按章节分段精简再拼接
+REFINE_CHUNK_TOKENS = 12000  # 分段精简时每段的token上限
+REFINE_MAP_CONCURRENCY = 4  # 单篇文献分段精简的并发请求数
+PASSAGE_TOKENS = 300  # 问答检索的段落大小（估算token数）
+CHAT_TOP_K = 6  # 每个问题发送的相关段落数
+RESPONSE_CACHE_FILE = "AnalysisResults/response_cache.db"  # API响应缓存
+RESPONSE_CACHE_MB = 64  # 响应缓存大小上限（MB），超出时淘汰最久未使用的条目
+RESPONSE_CACHE_TTL_DAYS = 90  # 缓存有效期（天），None表示永不过期
+
+# 文献导入配置
+EXTRACT_PROCESSES = max(1, (os.cpu_count() or 2) - 1)  # 文本提取进程数
+EXTRACT_PAGES_PER_TASK = 16  # 每个提取任务处理的页数
+IMPORT_EXTRACT_CONCURRENCY = EXTRACT_PROCESSES  # 提取阶段同时处理的文献数
+IMPORT_REFINE_CONCURRENCY = 4  # 精简阶段同时进行的API请求数
+IMPORT_ANALYZE_CONCURRENCY = 4  # 分析阶段同时进行的API请求数
+IMPORT_QUEUE_SIZE = 8  # 相邻阶段之间的队列容量，下游积压时上游暂停
+CHAT_TAIL_MESSAGES = 50  # 打开文献时加载的最近聊天消息数，也是"加载更早消息"的每页条数
+CHAT_HTML_CACHE_SIZE = 1000  # 缓存的聊天消息HTML条数
+CATALOG_COMMIT_BATCH = 16  # 文献库写入累计多少条后提交一次
+CATALOG_FLUSH_MS = 1000  # 未满一批的写入最迟多久提交（毫秒），短时间内的多次修改合并为一次提交
+CATALOG_CHECKPOINT_MINUTES = 5  # 定期把WAL日志合并回文献库的间隔（分钟）
+MARKDOWN_CACHE_SIZE = 256  # 缓存的Markdown渲染结果条数
@@ -0,0 +1,62 @@
+import time
+from PyQt5.QtWidgets import QVBoxLayout, QDialog, QLineEdit, QListWidget, QListWidgetItem, QLabel
+from PyQt5.QtCore import Qt, QTimer, pyqtSignal
+
+class LibrarySearchDialog(QDialog):
+    result_activated = pyqtSignal(str, int)  # (文献路径, 页码)
+
+    def __init__(self, library_index, parent=None):
+        super().__init__(parent)
+        self.library_index = library_index
+        self.setWindowTitle("全文检索")
+        self.resize(640, 480)
+        self.init_ui()
+
+    def init_ui(self):
+        layout = QVBoxLayout(self)
+
+        self.query_input = QLineEdit()
+        self.query_input.setPlaceholderText("在所有文献中搜索...")
+        layout.addWidget(self.query_input)
+
+        self.result_list = QListWidget()
+        self.result_list.setWordWrap(True)
+        self.result_list.itemActivated.connect(self.activate_item)
+        self.result_list.itemDoubleClicked.connect(self.activate_item)
+        layout.addWidget(self.result_list)
+
+        self.status_label = QLabel("")
+        layout.addWidget(self.status_label)
+
+        # 输入防抖
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(200)
+        self.search_timer.timeout.connect(self.perform_search)
+        self.query_input.textChanged.connect(self.search_timer.start)
+        self.query_input.returnPressed.connect(self.perform_search)
+
+    def perform_search(self):
+        self.search_timer.stop()
+        query = self.query_input.text().strip()
+        self.result_list.clear()
+        if not query:
+            self.status_label.clear()
+            return
+        start = time.perf_counter()
+        try:
+            results = self.library_index.search(query)
+        except Exception as e:
+            self.status_label.setText(f"查询失败: {str(e)}")
+            return
+        elapsed = (time.perf_counter() - start) * 1000
+
+        for result in results:
+            item = QListWidgetItem(f"{result['name']} · 第 {result['page'] + 1} 页\n{result['snippet']}")
+            item.setData(Qt.UserRole, (result['path'], result['page']))
+            self.result_list.addItem(item)
+        self.status_label.setText(f"{len(results)} 条结果（{elapsed:.0f} ms）")
+
+    def activate_item(self, item):
+        path, page = item.data(Qt.UserRole)
+        self.result_activated.emit(path, page)
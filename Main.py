@@ -1,9 +1,11 @@
 import sys
+import multiprocessing
 from PyQt5.QtWidgets import QApplication
 from PyQt5.QtGui import QFont
 from Components.LiteratureManager import LiteratureManager
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()  # 打包后文本提取子进程需要
     app = QApplication(sys.argv)
     app.setFont(QFont("Microsoft YaHei", 10))
     window = LiteratureManager()
@@ -0,0 +1,279 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import threading
+from Config.Config import CATALOG_FILE, ANALYSIS_DIR, CATALOG_COMMIT_BATCH
+
+
+class LibraryCatalog:
+    """文献库目录（SQLite，WAL模式）
+
+    文献、精简内容、分析结果、聊天记录、笔记与设置都保存在同一个数据库中，
+    每次修改只写入对应的记录，不再整体重写配置文件。
+    笔记、聊天、分析结果与设置的写入延后合并提交（见flush），事务保证崩溃时不会留下半条记录；
+    WAL合并（真正落盘的部分）在后台线程中进行。仅在界面线程中使用。
+    """
+
+    def __init__(self, db_path=CATALOG_FILE):
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path, timeout=30)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        self.pending_writes = 0  # 尚未提交的写入数
+        self._checkpoint_thread = None
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS settings (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            );
+            CREATE TABLE IF NOT EXISTS papers (
+                id INTEGER PRIMARY KEY,
+                path TEXT UNIQUE NOT NULL,
+                name TEXT NOT NULL,
+                content TEXT NOT NULL DEFAULT '',
+                added REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS analyses (
+                paper_id INTEGER PRIMARY KEY REFERENCES papers(id) ON DELETE CASCADE,
+                text TEXT NOT NULL,
+                updated REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS chat_messages (
+                id INTEGER PRIMARY KEY,
+                paper_id INTEGER NOT NULL REFERENCES papers(id) ON DELETE CASCADE,
+                role TEXT NOT NULL,
+                content TEXT NOT NULL,
+                type TEXT NOT NULL DEFAULT 'normal',
+                created REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS chat_messages_paper ON chat_messages (paper_id, id);
+            CREATE TABLE IF NOT EXISTS notes (
+                id TEXT PRIMARY KEY,
+                paper_id INTEGER NOT NULL REFERENCES papers(id) ON DELETE CASCADE,
+                page INTEGER NOT NULL,
+                x0 REAL, y0 REAL, x1 REAL, y1 REAL,
+                content TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS notes_paper ON notes (paper_id);
+        """)
+
+    def close(self):
+        """提交剩余写入，合并并截断WAL日志后关闭"""
+        self.flush()
+        if self._checkpoint_thread is not None:
+            self._checkpoint_thread.join()
+        self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        self.conn.close()
+
+    def flush(self):
+        """提交尚未提交的写入"""
+        if self.conn.in_transaction:
+            self.conn.commit()
+        self.pending_writes = 0
+
+    def checkpoint(self):
+        """在后台线程把WAL日志合并回数据库，避免日志文件持续增长"""
+        self.flush()
+        if self._checkpoint_thread is not None and self._checkpoint_thread.is_alive():
+            return
+        self._checkpoint_thread = threading.Thread(target=_checkpoint, args=(self.db_path,), daemon=True)
+        self._checkpoint_thread.start()
+
+    def _write(self, sql, params):
+        """延后提交的写入：累计 CATALOG_COMMIT_BATCH 条时自动提交，其余由调用方定时调用flush"""
+        self.conn.execute(sql, params)
+        self.pending_writes += 1
+        if self.pending_writes >= CATALOG_COMMIT_BATCH:
+            self.flush()
+
+    # 设置
+    def get_setting(self, key, default=None):
+        row = self.conn.execute("SELECT value FROM settings WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def set_setting(self, key, value):
+        self._write("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)", (key, value))
+
+    # 文献
+    def list_papers(self):
+        """按导入顺序返回 [{'id', 'name', 'path', 'has_analysis'}]"""
+        rows = self.conn.execute("""
+            SELECT p.id, p.name, p.path, a.paper_id IS NOT NULL AS has_analysis
+            FROM papers p LEFT JOIN analyses a ON a.paper_id = p.id
+            ORDER BY p.id
+        """).fetchall()
+        return [dict(row) for row in rows]
+
+    def add_paper(self, name, path, content):
+        """新增文献，返回id；路径已存在时返回None"""
+        try:
+            with self.conn:
+                cursor = self.conn.execute(
+                    "INSERT INTO papers (path, name, content, added) VALUES (?, ?, ?, ?)",
+                    (path, name, content, time.time()))
+            return cursor.lastrowid
+        except sqlite3.IntegrityError:
+            return None
+
+    def delete_paper(self, paper_id):
+        """删除文献及其分析、聊天记录和笔记"""
+        with self.conn:
+            self.conn.execute("DELETE FROM papers WHERE id = ?", (paper_id,))
+
+    def get_content(self, paper_id):
+        row = self.conn.execute("SELECT content FROM papers WHERE id = ?", (paper_id,)).fetchone()
+        return row[0] if row else ''
+
+    # 分析结果
+    def get_analysis(self, paper_id):
+        row = self.conn.execute("SELECT text FROM analyses WHERE paper_id = ?", (paper_id,)).fetchone()
+        return row[0] if row else None
+
+    def set_analysis(self, paper_id, text):
+        self._write("INSERT OR REPLACE INTO analyses (paper_id, text, updated) VALUES (?, ?, ?)",
+                    (paper_id, text, time.time()))
+
+    # 聊天记录
+    def get_chat(self, paper_id, limit=None, before_id=None):
+        """按时间顺序返回聊天记录 [{'id', 'role', 'content', 'type'}]
+
+        指定limit时只读取（before_id之前的）最后limit条，用于分页加载。
+        """
+        where, params = "paper_id = ?", [paper_id]
+        if before_id is not None:
+            where += " AND id < ?"
+            params.append(before_id)
+        if limit is None:
+            rows = self.conn.execute(
+                f"SELECT id, role, content, type FROM chat_messages WHERE {where} ORDER BY id", params)
+            return [dict(row) for row in rows]
+        rows = self.conn.execute(
+            f"SELECT id, role, content, type FROM chat_messages WHERE {where} ORDER BY id DESC LIMIT ?",
+            params + [limit]).fetchall()
+        return [dict(row) for row in reversed(rows)]
+
+    def chat_count(self, paper_id, before_id=None):
+        if before_id is None:
+            return self.conn.execute(
+                "SELECT COUNT(*) FROM chat_messages WHERE paper_id = ?", (paper_id,)).fetchone()[0]
+        return self.conn.execute(
+            "SELECT COUNT(*) FROM chat_messages WHERE paper_id = ? AND id < ?", (paper_id, before_id)).fetchone()[0]
+
+    def append_chat(self, paper_id, role, content, msg_type='normal'):
+        """追加一条消息（只追加，不改写已有记录）"""
+        self._write(
+            "INSERT INTO chat_messages (paper_id, role, content, type, created) VALUES (?, ?, ?, ?, ?)",
+            (paper_id, role, content, msg_type, time.time()))
+
+    def clear_chat(self, paper_id):
+        self._write("DELETE FROM chat_messages WHERE paper_id = ?", (paper_id,))
+
+    # 笔记
+    def get_notes(self, paper_id):
+        rows = self.conn.execute(
+            "SELECT id, page, x0, y0, x1, y1, content FROM notes WHERE paper_id = ? ORDER BY rowid", (paper_id,))
+        return [{
+            'id': row['id'],
+            'page': row['page'],
+            'rect': {'x0': row['x0'], 'y0': row['y0'], 'x1': row['x1'], 'y1': row['y1']},
+            'content': row['content']
+        } for row in rows]
+
+    def add_note(self, paper_id, note):
+        self._write(*_note_insert(paper_id, note))
+
+    def delete_note(self, note_id):
+        self._write("DELETE FROM notes WHERE id = ?", (str(note_id),))
+
+    # 从旧版 content.json + 附属文件迁移
+    def migrate_from_json(self, content_file):
+        """一次性导入旧版文献库，返回迁移的文献数；已迁移或不存在旧文件时返回0
+
+        旧文件保持原样作为备份，迁移完成后不再读写。
+        """
+        if self.get_setting('migrated_from_json') or not os.path.isfile(content_file):
+            return 0
+        try:
+            with open(content_file, 'r', encoding='utf-8') as f:
+                content = json.load(f)
+        except json.JSONDecodeError:
+            # 写入中途崩溃留下的不完整文件：移到一旁保留，不再阻止启动
+            corrupt_path = content_file + '.corrupt'
+            os.replace(content_file, corrupt_path)
+            raise ValueError(f"{content_file} 已损坏，已另存为 {corrupt_path}")
+
+        count = 0
+        with self.conn:
+            if content.get('api_key') and not self.get_setting('api_key'):
+                self.conn.execute("INSERT OR REPLACE INTO settings (key, value) VALUES ('api_key', ?)",
+                                  (content['api_key'],))
+            for p in content.get('papers', []):
+                if self.conn.execute("SELECT 1 FROM papers WHERE path = ?", (p['path'],)).fetchone():
+                    continue
+                cursor = self.conn.execute(
+                    "INSERT INTO papers (path, name, content, added) VALUES (?, ?, ?, ?)",
+                    (p['path'], p['name'], _read_text(p.get('content_path')), time.time()))
+                paper_id = cursor.lastrowid
+                analysis = _read_text(p.get('analysis_path'))
+                if analysis:
+                    self.conn.execute("INSERT INTO analyses (paper_id, text, updated) VALUES (?, ?, ?)",
+                                      (paper_id, analysis, time.time()))
+                for msg in _read_json(p.get('chat_history_path')) or []:
+                    self.conn.execute(
+                        "INSERT INTO chat_messages (paper_id, role, content, type, created) VALUES (?, ?, ?, ?, ?)",
+                        (paper_id, msg['role'], msg['content'], msg.get('type', 'normal'), time.time()))
+                # 早期版本的配置中没有notes_path，按名称推断
+                safe_name = re.sub(r'[\\/*?:"<>|]', '_', p['name'])
+                notes_path = p.get('notes_path') or os.path.join(ANALYSIS_DIR, f"{safe_name}_notes.json")
+                for note in _read_json(notes_path) or []:
+                    self.conn.execute(*_note_insert(paper_id, note))
+                count += 1
+            self.conn.execute("INSERT OR REPLACE INTO settings (key, value) VALUES ('migrated_from_json', '1')")
+        return count
+
+
+def _note_insert(paper_id, note):
+    rect = note['rect']
+    return ("INSERT OR REPLACE INTO notes (id, paper_id, page, x0, y0, x1, y1, content) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (str(note['id']), paper_id, note['page'], rect['x0'], rect['y0'], rect['x1'], rect['y1'], note['content']))
+
+
+def _checkpoint(db_path):
+    """后台线程中使用独立连接合并WAL（PASSIVE模式，不阻塞界面线程的读写）"""
+    try:
+        conn = sqlite3.connect(db_path, timeout=30)
+        try:
+            conn.execute("PRAGMA wal_checkpoint(PASSIVE)")
+        finally:
+            conn.close()
+    except Exception as e:
+        print(f"文献库日志合并失败: {e}")
+
+
+def _read_text(path):
+    if not path or not os.path.exists(path):
+        return ''
+    try:
+        with open(path, 'r', encoding='utf-8-sig') as f:
+            return f.read()
+    except Exception as e:
+        print(f"迁移时读取 {path} 失败: {e}")
+        return ''
+
+
+def _read_json(path):
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"迁移时读取 {path} 失败: {e}")
+        return None
@@ -0,0 +1,139 @@
+"""精简前的本地预裁剪
+
+在调用API精简之前，根据标题文字、字号与粗体等版面信息定位参考文献、致谢、附录，
+把这些尾部章节直接截掉，减少发送给模型的内容。
+"""
+import re
+import statistics
+from Utils.FitzLock import FITZ_LOCK, open_document
+from Utils.TokenEstimator import estimate_tokens
+
+# 尾部章节标题：可带编号（如 "7."、"A."、"VI."），整行不超过 MAX_HEADING_CHARS
+_TAIL_HEADING = re.compile(
+    r'^\s*(?:(?:\d+(?:\.\d+)*|[A-Z]|[IVX]+)\.?\s+)?'
+    r'(references|bibliography|works cited|literature cited|acknowledge?ments?|'
+    r'appendix|appendices|supplementary (?:material|information)|参考文献|致\s*谢|謝\s*辞|附\s*录)'
+    r'(?:\s+[A-Z0-9]+)?\s*[:：.]?\s*$',
+    re.IGNORECASE
+)
+MAX_HEADING_CHARS = 40
+MIN_POSITION = 0.4  # 只在文档后60%中查找，避免把目录或正文中的同名小节当成尾部
+BOLD_FLAG = 16  # PyMuPDF span flags 中的粗体位
+SIZE_SAMPLE_PAGES = 5  # 估计正文字号时采样的页数
+
+
+def is_tail_heading(text):
+    text = text.strip()
+    return 0 < len(text) <= MAX_HEADING_CHARS and bool(_TAIL_HEADING.match(text))
+
+
+def body_font_size(doc):
+    """按字符数加权的正文字号中位数"""
+    sizes = []
+    with FITZ_LOCK:
+        page_count = len(doc)
+    step = max(1, page_count // SIZE_SAMPLE_PAGES)
+    for page_num in range(0, page_count, step)[:SIZE_SAMPLE_PAGES]:
+        with FITZ_LOCK:
+            blocks = doc.load_page(page_num).get_text("dict")["blocks"]
+        for block in blocks:
+            for line in block.get("lines", []):
+                for span in line["spans"]:
+                    sizes.extend([round(span["size"], 1)] * min(len(span["text"].strip()), 200))
+    return statistics.median(sizes) if sizes else None
+
+
+def looks_like_heading(line, body_size):
+    """版面判断：字号大于正文、粗体或全大写"""
+    spans = [s for s in line["spans"] if s["text"].strip()]
+    if not spans:
+        return False
+    text = ''.join(s["text"] for s in spans).strip()
+    size = max(s["size"] for s in spans)
+    bold = all(s["flags"] & BOLD_FLAG or 'bold' in s["font"].lower() for s in spans)
+    if body_size is None:
+        return True
+    return size >= body_size * 1.05 or bold or (text.isupper() and len(text) > 3)
+
+
+def find_tail_start(file_path, pages):
+    """返回尾部章节的起点 (页码, 页内字符偏移)，未找到时返回None"""
+    first_page = int(len(pages) * MIN_POSITION)
+    # 先用纯文本快速筛出可能包含标题的页，只对这些页读取版面信息
+    candidates = [
+        page_num for page_num in range(first_page, len(pages))
+        if any(is_tail_heading(line) for line in pages[page_num].splitlines())
+    ]
+    if not candidates:
+        return None
+
+    with open_document(file_path) as doc:
+        with FITZ_LOCK:
+            is_pdf = doc.is_pdf
+        body_size = body_font_size(doc) if is_pdf else None
+        for page_num in candidates:
+            with FITZ_LOCK:
+                blocks = doc.load_page(page_num).get_text("dict")["blocks"]
+            for block in blocks:
+                for line in block.get("lines", []):
+                    text = ''.join(s["text"] for s in line["spans"])
+                    if is_tail_heading(text) and looks_like_heading(line, body_size):
+                        return page_num, heading_offset(pages[page_num], text.strip())
+    return None
+
+
+def heading_offset(page_text, heading):
+    """标题行在纯文本页中的字符偏移
+
+    只匹配整行即为该标题的行，避免命中正文句子中的同名单词；
+    版面文本与纯文本不一致时退回到第一个尾部标题行。
+    """
+    heading = ' '.join(heading.split())
+    position = 0
+    fallback = None
+    for line in page_text.splitlines(keepends=True):
+        if ' '.join(line.split()) == heading:
+            return position
+        if fallback is None and is_tail_heading(line):
+            fallback = position
+        position += len(line)
+    return fallback if fallback is not None else 0
+
+
+def trim_tail_sections(file_path, pages):
+    """截掉参考文献、致谢、附录等尾部章节，返回 (裁剪后文本, 报告)
+
+    报告包含裁剪前后的字节数与估算token数，未识别到尾部章节时原样返回全文。
+    """
+    full_text = ''.join(pages)
+    text = full_text
+    heading = None
+    try:
+        start = find_tail_start(file_path, pages)
+        if start is not None:
+            page_num, offset = start
+            text = ''.join(pages[:page_num]) + pages[page_num][:offset]
+            heading = pages[page_num][offset:].split('\n', 1)[0].strip()
+    except Exception as e:
+        print(f"本地预裁剪失败，使用全文: {e}")
+        text = full_text
+
+    original_bytes = len(full_text.encode('utf-8'))
+    trimmed_bytes = len(text.encode('utf-8'))
+    original_tokens = estimate_tokens(full_text)
+    trimmed_tokens = estimate_tokens(text)
+    report = {
+        'heading': heading,
+        'bytes_before': original_bytes,
+        'bytes_saved': original_bytes - trimmed_bytes,
+        'tokens_before': original_tokens,
+        'tokens_saved': original_tokens - trimmed_tokens,
+    }
+    return text, report
+
+
+def format_trim_report(report):
+    if not report or not report['bytes_saved']:
+        return "未识别到参考文献/附录"
+    return (f"本地裁剪「{report['heading']}」起的尾部章节，节省 {report['bytes_saved'] / 1024:.0f} KB"
+            f"（约 {report['tokens_saved']} tokens，占 {report['tokens_saved'] / max(1, report['tokens_before']):.0%}）")
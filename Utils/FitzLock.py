@@ -0,0 +1,22 @@
+"""PyMuPDF访问锁
+
+PyMuPDF不保证多线程安全：界面线程与各后台线程中的所有fitz调用
+（打开、读取、渲染、关闭）都需持有FITZ_LOCK。子进程中的调用不受影响。
+"""
+import threading
+from contextlib import contextmanager
+import fitz  # PyMuPDF
+
+FITZ_LOCK = threading.RLock()
+
+
+@contextmanager
+def open_document(file_path):
+    """在锁保护下打开文档，退出时同样在锁保护下关闭"""
+    with FITZ_LOCK:
+        doc = fitz.open(file_path)
+    try:
+        yield doc
+    finally:
+        with FITZ_LOCK:
+            doc.close()
@@ -0,0 +1,145 @@
+from collections import deque
+from PyQt5.QtCore import QObject, pyqtSignal
+from Config.Config import (IMPORT_EXTRACT_CONCURRENCY, IMPORT_REFINE_CONCURRENCY,
+                           IMPORT_ANALYZE_CONCURRENCY, IMPORT_QUEUE_SIZE)
+from Workers.TextExtractWorker import TextExtractWorker
+from Workers.FileUploadWorder import FileUploadWorker
+from Workers.AnalysisWorker import AnalysisWorker
+
+
+class PipelineStage:
+    """流水线的一个阶段：待处理队列 + 并发上限"""
+
+    def __init__(self, name, concurrency, capacity=None):
+        self.name = name
+        self.concurrency = concurrency
+        self.capacity = capacity  # None表示不限（流水线入口）
+        self.queue = deque()
+        self.backlog = deque()  # 低优先级任务：不占用队列容量，队列为空时才启动
+        self.active = {}  # 路径 -> 正在运行的worker
+
+    def paths(self):
+        return {item[0] for item in self.queue} | {item[0] for item in self.backlog} | set(self.active)
+
+
+class ImportPipeline(QObject):
+    """文献导入流水线：提取 -> 精简 -> 分析
+
+    每个阶段有独立的并发上限，相邻阶段之间的队列有容量限制：
+    下游队列已满（含上游正在运行、即将写入的任务）时上游不再启动新任务，
+    避免提取远快于API调用时大量原文堆积在内存中。
+    补交分析的旧文献进入分析阶段的低优先级队列，不计入容量，新导入的文献优先。
+    """
+    paper_imported = pyqtSignal(dict, str, bool)  # (file_data, paper_name, is_local)
+    analysis_complete = pyqtSignal(str, str, str)  # (result, paper_name, paper_path)
+    error_occurred = pyqtSignal(str, str)  # (阶段名, 错误信息)
+    progress_changed = pyqtSignal()
+
+    EXTRACT, REFINE, ANALYZE = 'extract', 'refine', 'analyze'
+
+    def __init__(self, api_key, parent=None):
+        super().__init__(parent)
+        self.api_key = api_key
+        self.stages = [
+            PipelineStage(self.EXTRACT, IMPORT_EXTRACT_CONCURRENCY),
+            PipelineStage(self.REFINE, IMPORT_REFINE_CONCURRENCY, IMPORT_QUEUE_SIZE),
+            PipelineStage(self.ANALYZE, IMPORT_ANALYZE_CONCURRENCY, IMPORT_QUEUE_SIZE),
+        ]
+        self.stage_map = {stage.name: stage for stage in self.stages}
+        self.workers = []  # 运行中的worker（退出时统一停止）
+        self._stopped = False
+
+    def submit(self, file_paths):
+        """从提取阶段开始导入新文献"""
+        pending = self.pending_paths()
+        stage = self.stage_map[self.EXTRACT]
+        for path in file_paths:
+            if path not in pending:
+                stage.queue.append((path,))
+                pending.add(path)
+        self._pump()
+
+    def submit_analysis(self, content, paper_name, paper_path):
+        """已导入但缺少分析结果的文献进入分析阶段的低优先级队列，不阻塞新文献的导入"""
+        stage = self.stage_map[self.ANALYZE]
+        if paper_path in stage.paths():
+            return
+        stage.backlog.append((paper_path, content, paper_name))
+        self._pump()
+
+    def pending_paths(self):
+        """尚未完成导入（提取或精简中）的文献路径"""
+        return self.stage_map[self.EXTRACT].paths() | self.stage_map[self.REFINE].paths()
+
+    def is_busy(self, stage_name):
+        stage = self.stage_map[stage_name]
+        return bool(stage.queue or stage.backlog or stage.active)
+
+    def counts(self):
+        """各阶段 (排队数, 运行数)"""
+        return {stage.name: (len(stage.queue) + len(stage.backlog), len(stage.active)) for stage in self.stages}
+
+    def stop(self):
+        """清空队列并停止所有worker"""
+        self._stopped = True
+        for stage in self.stages:
+            stage.queue.clear()
+            stage.backlog.clear()
+        for worker in self.workers:
+            if worker.isRunning():
+                worker.stop()
+
+    def _has_room(self, stage, next_stage):
+        # 上游正在运行的任务完成后都会写入下游队列，需预留位置
+        return len(next_stage.queue) + len(stage.active) < next_stage.capacity
+
+    def _pump(self):
+        """从下游到上游依次启动任务，使下游先腾出队列空间"""
+        if self._stopped:
+            return
+        for index in range(len(self.stages) - 1, -1, -1):
+            stage = self.stages[index]
+            next_stage = self.stages[index + 1] if index + 1 < len(self.stages) else None
+            while stage.queue and len(stage.active) < stage.concurrency:
+                if next_stage is not None and not self._has_room(stage, next_stage):
+                    break
+                self._start(stage, stage.queue.popleft())
+            # 低优先级任务只使用正常队列空出来的并发名额
+            while stage.backlog and not stage.queue and len(stage.active) < stage.concurrency:
+                self._start(stage, stage.backlog.popleft())
+        self.progress_changed.emit()
+
+    def _start(self, stage, item):
+        path = item[0]
+        if stage.name == self.EXTRACT:
+            worker = TextExtractWorker(path)
+            worker.extracted.connect(self._on_extracted)
+        elif stage.name == self.REFINE:
+            worker = FileUploadWorker(self.api_key, path, item[1])
+            worker.upload_complete.connect(self._on_refined)
+        else:
+            worker = AnalysisWorker(self.api_key, item[1], item[2], path)
+            worker.analysis_complete.connect(self.analysis_complete)
+        worker.error_occurred.connect(lambda error, name=stage.name: self.error_occurred.emit(name, error))
+        worker.finished.connect(lambda stage=stage, path=path, worker=worker: self._on_finished(stage, path, worker))
+        stage.active[path] = worker
+        self.workers.append(worker)
+        worker.start()
+
+    def _on_extracted(self, file_path, pages):
+        if not self._stopped:
+            self.stage_map[self.REFINE].queue.append((file_path, pages))
+
+    def _on_refined(self, file_data, paper_name, is_local):
+        if self._stopped:
+            return
+        self.paper_imported.emit(file_data, paper_name, is_local)
+        self.stage_map[self.ANALYZE].queue.append((file_data['path'], file_data['content'], paper_name))
+
+    def _on_finished(self, stage, path, worker):
+        stage.active.pop(path, None)
+        if self._stopped:
+            return  # 退出流程仍持有worker引用，交由窗口统一回收
+        self.workers.remove(worker)
+        worker.deleteLater()
+        self._pump()
@@ -0,0 +1,96 @@
+import re
+import sqlite3
+from Config.Config import LIBRARY_INDEX_FILE
+
+# 页面行的rowid = 文献id * PAGE_STRIDE + 页码，删除文献时可按rowid区间快速删除
+PAGE_STRIDE = 100000
+_CJK_CHARS = '\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff'  # 假名与中日韩统一表意文字
+_CJK = re.compile(f'([{_CJK_CHARS}])')
+# 生成摘要时去掉中文字符（及中文标点）之间的分词空格
+_CJK_GAP = re.compile(f'(?<=[{_CJK_CHARS}\\u3000-\\u303f]) (?=[{_CJK_CHARS}\\u3000-\\u303f])')
+
+
+def segment(text):
+    """在中日文字符之间插入空格，使unicode61分词器按单字建立索引"""
+    return _CJK.sub(r' \1 ', text)
+
+
+def build_match_query(query):
+    """将用户输入转换为FTS5查询：每个词作为短语并支持前缀匹配"""
+    terms = []
+    for term in query.split():
+        term = ' '.join(segment(term).split()).replace('"', '""')
+        if term:
+            terms.append(f'"{term}"*')
+    return ' '.join(terms)
+
+
+class LibraryIndex:
+    """基于SQLite FTS5的文献库全文索引（每个线程使用独立实例）"""
+
+    def __init__(self, db_path=LIBRARY_INDEX_FILE):
+        self.conn = sqlite3.connect(db_path, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS indexed_papers (
+                id INTEGER PRIMARY KEY,
+                path TEXT UNIQUE NOT NULL,
+                name TEXT NOT NULL
+            );
+            CREATE VIRTUAL TABLE IF NOT EXISTS page_text USING fts5(
+                text, tokenize='unicode61 remove_diacritics 2'
+            );
+        """)
+
+    def close(self):
+        self.conn.close()
+
+    def indexed_paths(self):
+        return {row[0] for row in self.conn.execute("SELECT path FROM indexed_papers")}
+
+    def index_paper(self, path, name, pages):
+        """写入（或替换）一篇文献的逐页文本"""
+        with self.conn:
+            self._delete(path)
+            cursor = self.conn.execute(
+                "INSERT INTO indexed_papers (path, name) VALUES (?, ?)", (path, name))
+            paper_id = cursor.lastrowid
+            self.conn.executemany(
+                "INSERT INTO page_text (rowid, text) VALUES (?, ?)",
+                ((paper_id * PAGE_STRIDE + page_num, segment(text))
+                 for page_num, text in enumerate(pages[:PAGE_STRIDE]) if text.strip())
+            )
+
+    def remove_paper(self, path):
+        with self.conn:
+            self._delete(path)
+
+    def _delete(self, path):
+        row = self.conn.execute("SELECT id FROM indexed_papers WHERE path = ?", (path,)).fetchone()
+        if row:
+            paper_id = row[0]
+            self.conn.execute(
+                "DELETE FROM page_text WHERE rowid >= ? AND rowid < ?",
+                (paper_id * PAGE_STRIDE, (paper_id + 1) * PAGE_STRIDE))
+            self.conn.execute("DELETE FROM indexed_papers WHERE id = ?", (paper_id,))
+
+    def search(self, query, limit=50):
+        """按BM25相关度返回 [{'path', 'name', 'page', 'snippet'}]"""
+        match = build_match_query(query)
+        if not match:
+            return []
+        rows = self.conn.execute(f"""
+            SELECT p.path, p.name, page_text.rowid % {PAGE_STRIDE},
+                   snippet(page_text, 0, '【', '】', '…', 16)
+            FROM page_text JOIN indexed_papers p ON p.id = page_text.rowid / {PAGE_STRIDE}
+            WHERE page_text MATCH ?
+            ORDER BY rank
+            LIMIT ?
+        """, (match, limit)).fetchall()
+        return [{
+            'path': path,
+            'name': name,
+            'page': page,
+            'snippet': _CJK_GAP.sub('', ' '.join(snippet.split()))
+        } for path, name, page, snippet in rows]
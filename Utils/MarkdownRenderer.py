@@ -0,0 +1,92 @@
+import re
+import html
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from markdown import Markdown
+from Config.Config import MARKDOWN_CACHE_SIZE
+
+_renderer = None
+_renderer_lock = threading.Lock()
+
+CODE_STYLE = '<code style="background-color: #F3F3F3; padding: 2px 4px; border-radius: 3px;">">'
+
+
+def get_renderer():
+    """全局共享的Markdown渲染服务"""
+    global _renderer
+    with _renderer_lock:
+        if _renderer is None:
+            _renderer = MarkdownRenderer()
+        return _renderer
+
+
+class MarkdownRenderer:
+    """带缓存的Markdown渲染
+
+    复用同一个Markdown实例（避免每次重新加载扩展），结果按内容哈希做LRU缓存；
+    分析结果可在后台线程预先渲染，界面切换文献时直接取缓存。
+    """
+
+    def __init__(self, max_entries=MARKDOWN_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._md = Markdown()
+        self._md_lock = threading.Lock()  # Markdown实例不是线程安全的
+        self._cache = OrderedDict()  # (类型, 内容哈希) -> HTML
+        self._cache_lock = threading.Lock()
+        self._executor = None
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, text):
+        """Markdown -> HTML"""
+        return self._cached('md', text, self._convert)
+
+    def render_analysis(self, text):
+        """分析结果：去除代码块标记、转义后渲染，并为行内代码添加样式"""
+        return self._cached('analysis', text, self._format_analysis)
+
+    def prerender_analysis(self, text):
+        """在后台线程预先渲染分析结果"""
+        with self._cache_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1)
+            executor = self._executor
+        executor.submit(self.render_analysis, text)
+
+    def shutdown(self):
+        """程序退出时取消尚未开始的预渲染"""
+        with self._cache_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def _cached(self, kind, text, convert):
+        key = (kind, hashlib.sha1(text.encode('utf-8', 'ignore')).hexdigest())
+        with self._cache_lock:
+            result = self._cache.get(key)
+            if result is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return result
+            self.misses += 1
+        result = convert(text)
+        with self._cache_lock:
+            self._cache[key] = result
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return result
+
+    def _convert(self, text):
+        with self._md_lock:
+            return self._md.reset().convert(text)
+
+    def _format_analysis(self, text):
+        # 去除代码块标记
+        text = re.sub(r'^```markdown\s*', '', text, flags=re.MULTILINE | re.IGNORECASE)
+        text = re.sub(r'\s*```$', '', text, flags=re.MULTILINE | re.IGNORECASE)
+        # 转换Markdown为HTML并转义特殊字符
+        html_text = self._convert(html.escape(text))
+        # 添加自定义样式
+        return html_text.replace('<code>', CODE_STYLE)
@@ -0,0 +1,141 @@
+import json
+import time
+import threading
+from collections import deque
+import requests
+from requests.adapters import HTTPAdapter
+from Config.Config import (MOONSHOT_API, API_POOL_SIZE, API_CONNECT_TIMEOUT, API_READ_TIMEOUT,
+                           API_REQUESTS_PER_MIN, API_TOKENS_PER_MIN, API_DEFAULT_RETRY_AFTER)
+from Utils.RateLimiter import RateLimiter, estimate_payload_tokens, parse_retry_after
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """全局共享的API客户端（所有worker线程共用一个连接池）"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = MoonshotClient()
+        return _client
+
+
+class MoonshotClient:
+    """Moonshot API客户端：Session连接池 + keep-alive + 请求统计
+
+    requests.Session 在多线程下共享是安全的（每个请求从连接池取独立连接），
+    pool_block=True 使并发超过 API_POOL_SIZE 时排队等待空闲连接而不是新建连接。
+    所有请求经过同一个 RateLimiter，任一请求收到429都会暂停全部请求。
+    """
+
+    LATENCY_WINDOW = 200  # 延迟统计保留最近的请求数
+
+    def __init__(self, base_url=MOONSHOT_API, pool_size=API_POOL_SIZE):
+        self.base_url = base_url
+        self.session = requests.Session()
+        self.adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, pool_block=True)
+        self.session.mount('https://', self.adapter)
+        self.session.mount('http://', self.adapter)
+        self.limiter = RateLimiter(API_REQUESTS_PER_MIN, API_TOKENS_PER_MIN)
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=self.LATENCY_WINDOW)
+        self._first_tokens = deque(maxlen=self.LATENCY_WINDOW)
+        self._requests = 0
+        self._errors = 0
+
+    def chat_completion(self, api_key, payload, timeout=API_READ_TIMEOUT, stream=False, should_continue=None):
+        """POST /chat/completions，返回 requests.Response（状态码由调用方处理）
+
+        发出前从限流器取得配额；等待期间should_continue返回False时抛出RequestCancelled。
+        """
+        self.limiter.acquire(estimate_payload_tokens(payload), should_continue)
+        headers = {
+            'Authorization': f'Bearer {api_key}',
+            'Content-Type': 'application/json'
+        }
+        start = time.perf_counter()
+        try:
+            response = self.session.post(
+                f"{self.base_url}/chat/completions",
+                headers=headers,
+                json=payload,
+                timeout=(API_CONNECT_TIMEOUT, timeout),
+                stream=stream
+            )
+        except requests.exceptions.RequestException:
+            with self._lock:
+                self._errors += 1
+            raise
+        # 流式请求记录的是收到响应头的耗时
+        self._record(time.perf_counter() - start)
+        if response.status_code == 429:
+            retry_after = parse_retry_after(response.headers.get('Retry-After'), API_DEFAULT_RETRY_AFTER)
+            self.limiter.pause(retry_after)
+            print(f"API限流(429)，全部请求暂停 {retry_after:.0f} 秒")
+        return response
+
+    @staticmethod
+    def iter_stream(response):
+        """解析SSE流式响应，逐个返回增量文本"""
+        response.encoding = 'utf-8'  # text/event-stream未声明字符集时requests默认按latin-1解码
+        # chunk_size=None：数据到达即返回，避免按固定块大小缓冲导致逐字输出变成整段输出
+        for line in response.iter_lines(chunk_size=None, decode_unicode=True):
+            if not line or not line.startswith('data:'):
+                continue
+            data = line[5:].strip()
+            if data == '[DONE]':
+                break
+            delta = json.loads(data)['choices'][0].get('delta', {})
+            if delta.get('content'):
+                yield delta['content']
+
+    def record_first_token(self, seconds):
+        """记录流式请求的首个token耗时（从发出请求开始计算）"""
+        with self._lock:
+            self._first_tokens.append(seconds)
+
+    def _record(self, seconds):
+        with self._lock:
+            self._requests += 1
+            self._latencies.append(seconds)
+
+    def _pool_counters(self):
+        """汇总urllib3连接池计数：(新建连接数, 经连接池发出的请求数)"""
+        pools = self.adapter.poolmanager.pools
+        with pools.lock:
+            pool_list = [pools[key] for key in pools.keys()]
+        return (sum(pool.num_connections for pool in pool_list),
+                sum(pool.num_requests for pool in pool_list))
+
+    def stats(self):
+        """请求数、延迟与连接复用统计"""
+        connections, pool_requests = self._pool_counters()  # connections为新建的TCP+TLS连接数
+        with self._lock:
+            latencies = sorted(self._latencies)
+            first_tokens = list(self._first_tokens)
+            requests_sent, errors = self._requests, self._errors
+        stats = {
+            'requests': requests_sent,
+            'errors': errors,
+            'connections': connections,
+            'reused': max(0, pool_requests - connections),
+            'avg_ms': 0.0,
+            'p50_ms': 0.0,
+            'p95_ms': 0.0,
+            'limiter': self.limiter.stats(),
+            'first_token_ms': sum(first_tokens) * 1000 / len(first_tokens) if first_tokens else 0.0,
+        }
+        if latencies:
+            stats['avg_ms'] = sum(latencies) * 1000 / len(latencies)
+            stats['p50_ms'] = latencies[len(latencies) // 2] * 1000
+            stats['p95_ms'] = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000
+        return stats
+
+    def format_stats(self):
+        s = self.stats()
+        return (f"请求数: {s['requests']}（失败 {s['errors']}）\n"
+                f"新建连接: {s['connections']}，复用连接: {s['reused']}\n"
+                f"延迟: 平均 {s['avg_ms']:.0f} ms，P50 {s['p50_ms']:.0f} ms，P95 {s['p95_ms']:.0f} ms\n"
+                f"流式首token: 平均 {s['first_token_ms']:.0f} ms\n"
+                f"限流: 429暂停 {s['limiter']['pauses']} 次，累计等待 {s['limiter']['waited']:.0f} 秒")
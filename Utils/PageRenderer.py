@@ -0,0 +1,122 @@
+from PyQt5.QtCore import QObject, QThreadPool, pyqtSignal
+from PyQt5.QtGui import QPixmap
+from Config.Config import RENDER_CACHE_MB, RENDER_THREADS, RENDER_ZOOM_STEP, TILE_SIZE
+from Utils.PixmapCache import PixmapCache
+from Workers.PageRenderWorker import PageRenderTask
+
+
+class PageRenderer(QObject):
+    """后台页面渲染调度：线程池 + LRU缓存
+
+    缓存键为 (文档路径, 页码, 缩放档位, 旋转角度, 瓦片)，
+    瓦片为 (列, 行) 时只渲染该区域，为 None 时渲染整页。
+    """
+    page_ready = pyqtSignal(object)  # 缓存键
+    render_failed = pyqtSignal(object, str)
+
+    PRIORITY_VISIBLE = 100  # 可见页面优先于所有预取任务
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.cache = PixmapCache(RENDER_CACHE_MB * 1024 * 1024)
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(RENDER_THREADS)
+        self._pending = {}  # key -> PageRenderTask（保持引用直到完成）
+        self._prefetching = set()  # 仍在排队的预取任务键
+
+    @staticmethod
+    def bucket_zoom(zoom):
+        """将缩放比例对齐到档位，使相近缩放共享缓存"""
+        steps = max(1, round(zoom / RENDER_ZOOM_STEP))
+        return round(steps * RENDER_ZOOM_STEP, 4)
+
+    @staticmethod
+    def make_key(file_path, page_num, zoom, rotation=0, tile=None):
+        return (file_path, page_num, zoom, rotation, tile)
+
+    def get(self, key):
+        return self.cache.get(key)
+
+    def find_nearest(self, file_path, page_num, zoom, rotation=0):
+        """查找同一页面缩放最接近的缓存图像（用于预览）"""
+        best, best_diff = None, None
+        for key in self.cache.keys():
+            if key[0] != file_path or key[1] != page_num or key[3] != rotation or key[4] is not None:
+                continue
+            diff = abs(key[2] - zoom)
+            if best_diff is None or diff < best_diff:
+                best, best_diff = key, diff
+        return self.cache.get(best) if best is not None else None
+
+    def request(self, key, priority=PRIORITY_VISIBLE):
+        """请求渲染，已缓存或已在队列中的页面直接忽略"""
+        if key in self.cache:
+            return
+        if key in self._pending:
+            # 预取中的页面变为可见时提升优先级
+            if key not in self._prefetching or priority <= 0:
+                return
+            self._take_prefetch(key)
+            if key in self._pending:
+                return
+        file_path, page_num, zoom, rotation, tile = key
+        clip = None
+        if tile is not None:
+            # 瓦片对应的页面区域（PDF坐标）
+            col, row = tile
+            clip = (col * TILE_SIZE / zoom, row * TILE_SIZE / zoom,
+                    (col + 1) * TILE_SIZE / zoom, (row + 1) * TILE_SIZE / zoom)
+        task = PageRenderTask(key, file_path, page_num, zoom, rotation, clip)
+        task.signals.rendered.connect(self._on_rendered)
+        task.signals.failed.connect(self._on_failed)
+        self._pending[key] = task
+        if priority <= 0:
+            self._prefetching.add(key)
+        self.pool.start(task, priority)
+
+    def prefetch(self, keys):
+        """按顺序低优先级预渲染，越靠前越先执行"""
+        for distance, key in enumerate(keys, start=1):
+            self.request(key, priority=-distance)
+
+    def cancel_prefetch(self):
+        """撤销尚未开始的预取任务（跳页或切换文档时调用）"""
+        for key in list(self._prefetching):
+            self._take_prefetch(key)
+
+    def withdraw(self, keys):
+        """撤销尚未开始的渲染任务（如滚出视口的瓦片）"""
+        for key in keys:
+            task = self._pending.get(key)
+            if task is not None and self.pool.tryTake(task):
+                del self._pending[key]
+                self._prefetching.discard(key)
+
+    def _take_prefetch(self, key):
+        self._prefetching.discard(key)
+        task = self._pending.get(key)
+        # 已开始执行的任务无法撤销，让其完成后进入缓存
+        if task is not None and self.pool.tryTake(task):
+            del self._pending[key]
+
+    def is_pending(self, key):
+        return key in self._pending
+
+    def clear_document(self, file_path):
+        """文档关闭或重新加载时丢弃其缓存"""
+        self.cache.discard_where(lambda key: key[0] == file_path)
+
+    def _on_rendered(self, key, image, pix):
+        self._pending.pop(key, None)
+        self._prefetching.discard(key)
+        # QPixmap只能在界面线程创建；这是整个渲染路径上唯一的一次拷贝，
+        # 同时转换为可直接绘制的原生格式，之后pix即可释放
+        self.cache.put(key, QPixmap.fromImage(image))
+        del image, pix
+        self.page_ready.emit(key)
+
+    def _on_failed(self, key, error):
+        self._pending.pop(key, None)
+        self._prefetching.discard(key)
+        print(f"页面渲染失败: {error}")
+        self.render_failed.emit(key, error)
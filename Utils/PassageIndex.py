@@ -0,0 +1,159 @@
+import os
+import re
+import gzip
+import json
+import math
+import threading
+from collections import Counter, OrderedDict
+from Config.Config import PASSAGE_TOKENS
+from Utils.TextChunker import pack
+from Utils.TextIndex import file_hash, index_file_path, save_index_file
+
+INDEX_VERSION = 1
+K1 = 1.5
+B = 0.75
+_WORD = re.compile(r'[a-z0-9]+(?:[-\'][a-z0-9]+)*')
+_CJK_RUN = re.compile('[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+')
+_STOPWORDS = frozenset(
+    'a an and are as at be by for from has have in is it its of on or that the this to was were with '
+    'we our can which these those been their not but also into than then there'.split()
+)
+
+
+def tokenize(text):
+    """英文按单词（去停用词），中日文按相邻两字切分"""
+    text = text.lower()
+    tokens = [w for w in _WORD.findall(text) if w not in _STOPWORDS and len(w) > 1]
+    for run in _CJK_RUN.findall(text):
+        if len(run) == 1:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+class PassageIndex:
+    """文献段落的BM25检索索引
+
+    逐页切分为约 PASSAGE_TOKENS 的段落，问答时只把与问题最相关的段落发给模型。
+    索引保存在ANALYSIS_DIR中，文件内容哈希变化时重建。
+    """
+
+    _loaded = OrderedDict()  # 路径 -> PassageIndex，进程内复用最近加载的索引
+    _loaded_lock = threading.Lock()
+    MAX_LOADED = 8
+
+    def __init__(self, file_hash, passages):
+        self.file_hash = file_hash
+        self.passages = passages  # [[页码, 文本]]
+        self.term_freqs = [Counter(tokenize(text)) for _, text in passages]
+        self.lengths = [sum(tf.values()) for tf in self.term_freqs]
+        self.avg_length = sum(self.lengths) / len(self.lengths) if self.lengths else 0
+        df = Counter()
+        for tf in self.term_freqs:
+            df.update(tf.keys())
+        n = len(passages)
+        self.idf = {term: math.log(1 + (n - count + 0.5) / (count + 0.5)) for term, count in df.items()}
+
+    @staticmethod
+    def index_path(file_path):
+        return index_file_path(file_path, "passages.json.gz")
+
+    @classmethod
+    def build(cls, file_path, pages, digest=None):
+        """由逐页文本构建并保存索引"""
+        digest = digest or file_hash(file_path)
+        passages = []
+        for page_num, text in enumerate(pages):
+            if text.strip():
+                passages.extend([page_num, chunk] for chunk in pack([text], PASSAGE_TOKENS) if chunk.strip())
+        index = cls(digest, passages)
+        try:
+            save_index_file(cls.index_path(file_path),
+                            {'version': INDEX_VERSION, 'file_hash': digest, 'passages': passages})
+        except Exception as e:
+            print(f"保存段落索引失败: {e}")
+        cls._remember(file_path, index)
+        return index
+
+    @classmethod
+    def load(cls, file_path):
+        """读取已建立的索引，不存在或已过期时返回None"""
+        with cls._loaded_lock:
+            index = cls._loaded.get(file_path)
+            if index is not None:
+                cls._loaded.move_to_end(file_path)
+                return index
+        path = cls.index_path(file_path)
+        if not os.path.exists(path):
+            return None
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') != INDEX_VERSION or data.get('file_hash') != file_hash(file_path):
+                return None
+            index = cls(data['file_hash'], data['passages'])
+        except Exception as e:
+            print(f"读取段落索引失败: {e}")
+            return None
+        cls._remember(file_path, index)
+        return index
+
+    @classmethod
+    def exists(cls, file_path):
+        return os.path.exists(cls.index_path(file_path))
+
+    @classmethod
+    def _remember(cls, file_path, index):
+        with cls._loaded_lock:
+            cls._loaded[file_path] = index
+            cls._loaded.move_to_end(file_path)
+            while len(cls._loaded) > cls.MAX_LOADED:
+                cls._loaded.popitem(last=False)
+
+    @classmethod
+    def forget(cls, file_path):
+        with cls._loaded_lock:
+            cls._loaded.pop(file_path, None)
+
+    def scores(self, query):
+        terms = set(tokenize(query))
+        scores = []
+        for tf, length in zip(self.term_freqs, self.lengths):
+            score = 0.0
+            for term in terms:
+                freq = tf.get(term)
+                if freq:
+                    norm = K1 * (1 - B + B * length / self.avg_length)
+                    score += self.idf[term] * freq * (K1 + 1) / (freq + norm)
+            scores.append(score)
+        return scores
+
+    def search(self, query, k):
+        """得分最高的k个段落下标（得分为0的不返回）"""
+        scores = self.scores(query)
+        ranked = sorted(range(len(scores)), key=lambda i: scores[i], reverse=True)
+        return [i for i in ranked[:k] if scores[i] > 0]
+
+    def passage_for_selection(self, page_num, text):
+        """框选文本所在的段落：同一页中与选中文本重合词最多的段落"""
+        selected = Counter(tokenize(text))
+        best, best_overlap = None, 0
+        for i, (page, _) in enumerate(self.passages):
+            if page != page_num:
+                continue
+            overlap = sum((self.term_freqs[i] & selected).values())
+            if overlap > best_overlap:
+                best, best_overlap = i, overlap
+        return best
+
+    def build_context(self, question, k, selection=None):
+        """拼接问答上下文：选区所在段落 + 与问题最相关的k个段落，按原文顺序排列"""
+        chosen = set(self.search(question, k))
+        if selection is not None:
+            selected = self.passage_for_selection(*selection)
+            if selected is not None:
+                chosen.add(selected)
+        if not chosen:
+            chosen = set(range(min(k, len(self.passages))))  # 无匹配时退回文献开头
+        return "\n\n".join(f"[第{self.passages[i][0] + 1}页]\n{self.passages[i][1].strip()}" for i in sorted(chosen))
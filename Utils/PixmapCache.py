@@ -0,0 +1,58 @@
+from collections import OrderedDict
+
+
+class PixmapCache:
+    """按字节预算淘汰的LRU图像缓存"""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self._items = OrderedDict()  # key -> (pixmap, size)
+
+    @staticmethod
+    def pixmap_bytes(pixmap):
+        """估算QPixmap占用的内存"""
+        return pixmap.width() * pixmap.height() * max(pixmap.depth(), 8) // 8
+
+    def get(self, key):
+        item = self._items.get(key)
+        if item is None:
+            return None
+        self._items.move_to_end(key)  # 标记为最近使用
+        return item[0]
+
+    def put(self, key, pixmap):
+        self.discard(key)
+        size = self.pixmap_bytes(pixmap)
+        self._items[key] = (pixmap, size)
+        self.current_bytes += size
+        self._evict()
+
+    def discard(self, key):
+        item = self._items.pop(key, None)
+        if item is not None:
+            self.current_bytes -= item[1]
+
+    def discard_where(self, predicate):
+        """删除所有满足条件的缓存项"""
+        for key in [k for k in self._items if predicate(k)]:
+            self.discard(key)
+
+    def keys(self):
+        return list(self._items)
+
+    def clear(self):
+        self._items.clear()
+        self.current_bytes = 0
+
+    def _evict(self):
+        # 超出预算时从最久未使用的一端淘汰，至少保留最新的一项
+        while self.current_bytes > self.max_bytes and len(self._items) > 1:
+            _, (_, size) = self._items.popitem(last=False)
+            self.current_bytes -= size
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def __len__(self):
+        return len(self._items)
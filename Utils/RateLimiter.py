@@ -0,0 +1,96 @@
+import time
+import threading
+from email.utils import parsedate_to_datetime
+from Utils.TokenEstimator import estimate_messages_tokens
+
+
+class RequestCancelled(Exception):
+    """等待配额期间调用方已停止"""
+
+
+def estimate_payload_tokens(payload):
+    """估算一次请求消耗的token数（输入估算 + 输出上限）"""
+    return estimate_messages_tokens(payload.get('messages', [])) + payload.get('max_tokens', 0)
+
+
+def parse_retry_after(value, default):
+    """解析Retry-After头（秒数或HTTP日期）"""
+    if not value:
+        return default
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return default
+
+
+class RateLimiter:
+    """全局令牌桶限流：每分钟请求数 + 每分钟token数
+
+    所有API请求发出前先 acquire，配额不足时阻塞等待。
+    任一请求收到429时调用 pause，整个进程内的请求在Retry-After期间都暂停，
+    避免各线程各自重试造成请求风暴。
+    """
+
+    WAIT_SLICE = 0.5  # 等待时每隔该时间检查一次调用方是否已停止
+
+    def __init__(self, requests_per_min, tokens_per_min):
+        self.req_capacity = requests_per_min
+        self.tok_capacity = tokens_per_min
+        self.req_level = float(requests_per_min)
+        self.tok_level = float(tokens_per_min)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._cond = threading.Condition()
+        self.pauses = 0
+        self.waited = 0.0  # 累计等待秒数（所有线程）
+
+    def _refill(self, now):
+        elapsed = now - self.updated
+        self.updated = now
+        self.req_level = min(self.req_capacity, self.req_level + elapsed * self.req_capacity / 60)
+        self.tok_level = min(self.tok_capacity, self.tok_level + elapsed * self.tok_capacity / 60)
+
+    def acquire(self, tokens=0, should_continue=None):
+        """取得一次请求配额，tokens超过桶容量时按桶容量计"""
+        tokens = min(tokens, self.tok_capacity)
+        start = time.monotonic()
+        with self._cond:
+            while True:
+                if should_continue is not None and not should_continue():
+                    raise RequestCancelled()
+                now = time.monotonic()
+                if now < self.paused_until:
+                    self.updated = now  # 暂停期间不累积配额，恢复后按速率逐步放行
+                    wait = self.paused_until - now
+                else:
+                    self._refill(now)
+                    wait = max((1 - self.req_level) * 60 / self.req_capacity,
+                               (tokens - self.tok_level) * 60 / self.tok_capacity)
+                    if wait <= 0:
+                        self.req_level -= 1
+                        self.tok_level -= tokens
+                        self.waited += now - start
+                        return
+                self._cond.wait(min(wait, self.WAIT_SLICE))
+
+    def pause(self, seconds):
+        """收到429后暂停所有请求，并清空请求桶以免恢复瞬间集中发出"""
+        with self._cond:
+            now = time.monotonic()
+            if now + seconds > self.paused_until:
+                self.paused_until = now + seconds
+                self.pauses += 1
+            self.updated = now
+            self.req_level = min(self.req_level, 0.0)
+
+    def stats(self):
+        with self._cond:
+            return {
+                'pauses': self.pauses,
+                'waited': self.waited,
+                'paused_for': max(0.0, self.paused_until - time.monotonic()),
+            }
@@ -0,0 +1,122 @@
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from Config.Config import RESPONSE_CACHE_FILE, RESPONSE_CACHE_MB, RESPONSE_CACHE_TTL_DAYS
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """全局共享的API响应缓存"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResponseCache()
+        return _cache
+
+
+def make_key(payload):
+    """按 (模型, 消息, 其余参数) 计算内容哈希，与是否流式返回无关"""
+    params = {k: v for k, v in payload.items() if k not in ('model', 'messages', 'stream')}
+    data = json.dumps([payload.get('model'), payload.get('messages'), params],
+                      ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+
+class ResponseCache:
+    """内容寻址的API响应缓存（SQLite持久化）
+
+    相同的请求内容（如同一文献换路径重新导入、重复翻译同一段文字）直接返回缓存结果。
+    总大小超过 RESPONSE_CACHE_MB 时按最近访问时间淘汰，超过有效期的条目视为未命中。
+    """
+
+    def __init__(self, db_path=RESPONSE_CACHE_FILE, max_bytes=RESPONSE_CACHE_MB * 1024 * 1024,
+                 ttl_days=RESPONSE_CACHE_TTL_DAYS):
+        self.max_bytes = max_bytes
+        self.ttl = ttl_days * 86400 if ttl_days else None
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created REAL NOT NULL,
+                accessed REAL NOT NULL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+        self.total_bytes = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            row = self.conn.execute("SELECT value, size, created FROM responses WHERE key = ?", (key,)).fetchone()
+            now = time.time()
+            if row and self.ttl is not None and now - row[2] > self.ttl:
+                with self.conn:
+                    self.conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self.total_bytes -= row[1]
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            with self.conn:
+                self.conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            return row[0]
+
+    def put(self, key, value):
+        size = len(value.encode('utf-8'))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            now = time.time()
+            with self.conn:
+                old = self.conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, value, size, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                    (key, value, size, now, now))
+                self.total_bytes += size - (old[0] if old else 0)
+                self._evict()
+
+    def _evict(self):
+        """按最近访问时间从旧到新删除，直到总大小回到上限以内"""
+        while self.total_bytes > self.max_bytes:
+            rows = self.conn.execute(
+                "SELECT key, size FROM responses ORDER BY accessed LIMIT 32").fetchall()
+            if not rows:
+                self.total_bytes = 0
+                return
+            for key, size in rows:
+                self.conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self.total_bytes -= size
+                if self.total_bytes <= self.max_bytes:
+                    return
+
+    def clear(self):
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM responses")
+            self.total_bytes = 0
+
+    def stats(self):
+        with self._lock:
+            count = self.conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            total = self.hits + self.misses
+            return {
+                'entries': count,
+                'bytes': self.total_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0,
+            }
+
+    def format_stats(self):
+        s = self.stats()
+        return (f"响应缓存: {s['entries']} 条，{s['bytes'] / 1024 / 1024:.1f} MB\n"
+                f"命中 {s['hits']} 次，未命中 {s['misses']} 次，命中率 {s['hit_rate']:.0%}")
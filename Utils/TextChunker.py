@@ -0,0 +1,69 @@
+import re
+from Utils.TokenEstimator import estimate_tokens
+
+# 章节标题行：Markdown标题、"1 Introduction"/"2.3 Results"、"一、引言"/"第二章"、全大写短行
+_HEADING = re.compile(
+    r'^\s*(?:#{1,6}\s+\S'
+    r'|\d+(?:\.\d+){0,2}\.?\s+[A-Z\u4e00-\u9fff]'
+    r'|[一二三四五六七八九十]+[、.．]'
+    r'|第[一二三四五六七八九十\d]+[章节部分]'
+    r'|[A-Z][A-Z \-]{3,40}$)'
+)
+MAX_HEADING_CHARS = 80
+
+
+def is_section_heading(line):
+    line = line.strip()
+    return 0 < len(line) <= MAX_HEADING_CHARS and bool(_HEADING.match(line))
+
+
+def split_sections(text):
+    """按章节标题切分，返回 [(标题, 正文)]，标题前的内容标题为空串"""
+    sections = []
+    title, lines = '', []
+    for line in text.splitlines(keepends=True):
+        if is_section_heading(line) and ''.join(lines).strip():
+            sections.append((title, ''.join(lines)))
+            title, lines = line.strip(), [line]
+        else:
+            if not lines and is_section_heading(line):
+                title = line.strip()
+            lines.append(line)
+    if ''.join(lines).strip():
+        sections.append((title, ''.join(lines)))
+    return sections
+
+
+def split_oversized(text, max_tokens):
+    """超出预算的文本依次按段落、行、字符切开（切分无损，拼接后与原文一致）"""
+    tokens = estimate_tokens(text)
+    if tokens <= max_tokens:
+        return [text]
+    for parts in (re.split(r'(?<=\n\n)', text), text.splitlines(keepends=True)):
+        parts = [p for p in parts if p]
+        if len(parts) > 1:
+            return [piece for part in parts for piece in split_oversized(part, max_tokens)]
+    # 无法按行切分时按估算的字符/token比例切
+    step = max(1, len(text) * max_tokens // tokens)
+    return [text[i:i + step] for i in range(0, len(text), step)]
+
+
+def pack(parts, max_tokens):
+    """把连续片段贪心合并为不超过预算的块，保持原顺序"""
+    chunks, current, current_tokens = [], [], 0
+    for part in parts:
+        for piece in split_oversized(part, max_tokens):
+            tokens = estimate_tokens(piece)
+            if current and current_tokens + tokens > max_tokens:
+                chunks.append(''.join(current))
+                current, current_tokens = [], 0
+            current.append(piece)
+            current_tokens += tokens
+    if current:
+        chunks.append(''.join(current))
+    return chunks
+
+
+def chunk_by_sections(text, max_tokens):
+    """优先在章节边界处切分，每块不超过max_tokens（估算值）"""
+    return pack([body for _, body in split_sections(text)], max_tokens)
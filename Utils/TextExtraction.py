@@ -0,0 +1,63 @@
+"""多进程PDF文本提取
+
+PyMuPDF解析时持有GIL，线程无法并行，因此把页面区间分发到进程池。
+多个文献同时提交时，各文献的页面任务在同一进程池中交错执行。
+短文献整体作为一个任务提交，只有未启用进程池时才在调用线程内（持有FITZ_LOCK）解析。
+"""
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import fitz  # PyMuPDF
+from Config.Config import EXTRACT_PROCESSES, EXTRACT_PAGES_PER_TASK
+from Utils.FitzLock import FITZ_LOCK, open_document
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # 统一使用spawn：界面进程中有Qt线程，fork可能继承被占用的锁
+            _executor = ProcessPoolExecutor(max_workers=EXTRACT_PROCESSES,
+                                            mp_context=multiprocessing.get_context('spawn'))
+        return _executor
+
+
+def shutdown_executor():
+    """程序退出时关闭进程池，取消尚未开始的任务"""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+def extract_page_range(file_path, start, stop):
+    """子进程中执行：返回 [start, stop) 页的文本"""
+    with fitz.open(file_path) as doc:
+        return [doc.load_page(i).get_text() for i in range(start, stop)]
+
+
+def extract_pages(file_path):
+    """按页提取文本，返回与页码对应的列表"""
+    with open_document(file_path) as doc:
+        with FITZ_LOCK:
+            page_count = len(doc)
+        if EXTRACT_PROCESSES <= 1:
+            pages = []
+            for page_num in range(page_count):
+                with FITZ_LOCK:
+                    pages.append(doc.load_page(page_num).get_text())
+            return pages
+
+    executor = get_executor()
+    futures = [
+        executor.submit(extract_page_range, file_path, start, min(start + EXTRACT_PAGES_PER_TASK, page_count))
+        for start in range(0, page_count, EXTRACT_PAGES_PER_TASK)
+    ]
+    pages = []
+    for future in futures:
+        pages.extend(future.result())
+    return pages
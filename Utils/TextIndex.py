@@ -0,0 +1,203 @@
+import os
+import re
+import gzip
+import json
+import bisect
+import hashlib
+import threading
+import fitz  # PyMuPDF
+from Config.Config import ANALYSIS_DIR
+from Utils.FitzLock import FITZ_LOCK, open_document
+
+INDEX_VERSION = 2
+# 中日文字符（含全角标点）：文本中没有空格分隔，逐字建立索引
+_CJK = re.compile('[\u3000-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uff00-\uffef]')
+_SPACE_NEAR_CJK = re.compile('(?<=[\u3000-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uff00-\uffef]) '
+                             '| (?=[\u3000-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uff00-\uffef])')
+
+
+def file_hash(file_path):
+    """计算文件内容哈希，用于判断索引是否过期"""
+    sha1 = hashlib.sha1()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            sha1.update(chunk)
+    return sha1.hexdigest()
+
+
+def save_index_file(path, data):
+    """原子写入gzip压缩的JSON索引：先写临时文件再替换，写入中途崩溃不会留下不完整的索引"""
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def index_file_path(file_path, suffix):
+    """索引文件路径：保留文件名便于辨认，并附加完整路径的哈希，避免同名文献互相覆盖"""
+    safe_name = re.sub(r'[\\/*?:"<>|]', '_', os.path.basename(file_path))
+    path_hash = hashlib.sha1(os.path.abspath(file_path).encode('utf-8')).hexdigest()[:12]
+    return os.path.join(ANALYSIS_DIR, f"{safe_name}_{path_hash}_{suffix}")
+
+
+def normalize_text(text):
+    """统一大小写并合并空白（中日文字符两侧的空白去掉），与search_for的大小写不敏感行为一致"""
+    return _SPACE_NEAR_CJK.sub('', ' '.join(text.lower().split()))
+
+
+def page_words(page):
+    """由逐字符版面信息切分单词：西文按空白切分，中日文每个字单独成词（调用方须持有FITZ_LOCK）
+
+    get_text("words")只按空白切分，整行中文会成为一个"单词"，无法精确定位与框选。
+    返回 [x0, y0, x1, y1, text, block, line]。
+    """
+    words = []
+    for block_num, block in enumerate(page.get_text("rawdict")["blocks"]):
+        for line_num, line in enumerate(block.get("lines", [])):
+            current = None
+            for span in line["spans"]:
+                for char in span["chars"]:
+                    c = char["c"]
+                    x0, y0, x1, y1 = char["bbox"]
+                    if not c or c.isspace():
+                        current = None
+                    elif _CJK.match(c):
+                        words.append([x0, y0, x1, y1, c, block_num, line_num])
+                        current = None
+                    elif current is None:
+                        current = [x0, y0, x1, y1, c, block_num, line_num]
+                        words.append(current)
+                    else:
+                        current[0], current[1] = min(current[0], x0), min(current[1], y0)
+                        current[2], current[3] = max(current[2], x1), max(current[3], y1)
+                        current[4] += c
+    return words
+
+
+def word_separator(prev, word):
+    """相邻单词间的分隔：同一行内与中日文相邻时不加空格"""
+    if (prev[5], prev[6]) == (word[5], word[6]) and (_CJK.match(prev[4][-1]) or _CJK.match(word[4][0])):
+        return ''
+    return ' '
+
+
+def join_words(words):
+    parts = []
+    for i, word in enumerate(words):
+        if i:
+            parts.append(word_separator(words[i - 1], word))
+        parts.append(word[4])
+    return ''.join(parts)
+
+
+class PageWords:
+    """单页的单词坐标与规范化文本"""
+
+    def __init__(self, words):
+        self.words = words  # [x0, y0, x1, y1, text, block, line]
+        parts = []
+        self.starts = []  # 每个单词在规范化文本中的起始偏移
+        offset = 0
+        for i, word in enumerate(words):
+            if i:
+                separator = word_separator(words[i - 1], word)
+                parts.append(separator)
+                offset += len(separator)
+            token = normalize_text(word[4])
+            self.starts.append(offset)
+            parts.append(token)
+            offset += len(token)
+        self.text = ''.join(parts)
+
+    def find(self, query):
+        """返回匹配的矩形列表，同一行内的相邻单词合并为一个矩形"""
+        rects = []
+        pos = self.text.find(query)
+        while pos != -1:
+            first = bisect.bisect_right(self.starts, pos) - 1
+            last = bisect.bisect_right(self.starts, pos + len(query) - 1) - 1
+            line_rect, line_id = None, None
+            for word in self.words[first:last + 1]:
+                word_rect = fitz.Rect(word[:4])
+                if (word[5], word[6]) == line_id:
+                    line_rect |= word_rect
+                else:
+                    if line_rect is not None:
+                        rects.append(line_rect)
+                    line_rect, line_id = word_rect, (word[5], word[6])
+            if line_rect is not None:
+                rects.append(line_rect)
+            pos = self.text.find(query, pos + len(query))
+        return rects
+
+    def words_in_rect(self, rect):
+        """中心点落在选区内的单词"""
+        return [word for word in self.words
+                if rect.x0 <= (word[0] + word[2]) / 2 <= rect.x1
+                and rect.y0 <= (word[1] + word[3]) / 2 <= rect.y1]
+
+
+class DocumentTextIndex:
+    """文档级单词索引：一次解析，之后搜索与框选都从内存获取
+
+    索引保存在ANALYSIS_DIR中，文件内容哈希变化时重建。
+    """
+
+    def __init__(self, file_hash, pages):
+        self.file_hash = file_hash
+        self.pages = [PageWords(words) for words in pages]
+
+    @staticmethod
+    def index_path(file_path):
+        return index_file_path(file_path, "words.json.gz")
+
+    @classmethod
+    def load_or_build(cls, file_path, should_continue=lambda: True):
+        """优先读取磁盘缓存，哈希不一致时重新解析并保存"""
+        digest = file_hash(file_path)
+        path = cls.index_path(file_path)
+        if os.path.exists(path):
+            try:
+                with gzip.open(path, 'rt', encoding='utf-8') as f:
+                    data = json.load(f)
+                if data.get('version') == INDEX_VERSION and data.get('file_hash') == digest:
+                    return cls(digest, data['pages'])
+            except Exception as e:
+                print(f"读取文本索引失败: {e}")
+
+        pages = []
+        with open_document(file_path) as doc:
+            with FITZ_LOCK:
+                page_count = len(doc)
+            for page_num in range(page_count):
+                if not should_continue():
+                    return None
+                with FITZ_LOCK:
+                    words = page_words(doc.load_page(page_num))
+                pages.append(words)
+        index = cls(digest, pages)
+        try:
+            save_index_file(path, {'version': INDEX_VERSION, 'file_hash': digest, 'pages': pages})
+        except Exception as e:
+            print(f"保存文本索引失败: {e}")
+        return index
+
+    def search(self, text):
+        """返回 [(页码, [fitz.Rect])]，仅包含有匹配的页面"""
+        query = normalize_text(text)
+        if not query:
+            return []
+        results = []
+        for page_num, page in enumerate(self.pages):
+            rects = page.find(query)
+            if rects:
+                results.append((page_num, rects))
+        return results
+
+    def selection_text(self, page_num, rect):
+        """框选区域内的文本（西文以空格拼接，中日文直接相连）"""
+        return join_words(self.pages[page_num].words_in_rect(rect)).strip()
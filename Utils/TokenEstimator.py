@@ -0,0 +1,18 @@
+import re
+
+# 中日韩字符大致每字1个token，其余文本大致每4个字符1个token
+_CJK = re.compile('[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uff00-\uffef]')
+
+
+def estimate_tokens(text):
+    """本地估算文本的token数（偏保守，用于预算判断，不要求精确）"""
+    if not text:
+        return 0
+    cjk = len(_CJK.findall(text))
+    other = len(text) - cjk - text.count(' ') - text.count('\n')
+    return cjk + max(0, other) // 4 + 1
+
+
+def estimate_messages_tokens(messages):
+    """消息列表的token数（每条消息另计少量格式开销）"""
+    return sum(estimate_tokens(m.get('content', '')) + 4 for m in messages)
@@ -1,10 +1,17 @@
-import re
 import time
 import requests
 from Workers.BaseWorker import BaseWorker
-from Config.Config import MOONSHOT_API
+from Utils.MoonshotClient import get_client
+from Utils.ResponseCache import get_cache, make_key
+from Utils.RateLimiter import RequestCancelled
 from PyQt5.QtCore import pyqtSignal
 
+ANALYSIS_PROMPT = ("你是一个专业的学术研究助理，请严格按照以下结构分析文献：\n"
+                   "1. 研究背景（200字）\n2. 研究方法（300字）\n"
+                   "3. 主要发现（300字）\n4. 创新点（200字）\n"
+                   "5. 局限性与展望（200字）")
+
+
 class AnalysisWorker(BaseWorker):
     analysis_complete = pyqtSignal(str, str, str)  # (result, paper_name, paper_path)
     error_occurred = pyqtSignal(str)
@@ -17,73 +24,80 @@ class AnalysisWorker(BaseWorker):
         self.paper_path = paper_path
         self.max_retries = 10  # 最大重试次数
         self.retry_delay = 2  # 初始重试延迟(秒)
+        self.max_retry_delay = 30  # 单次退避上限(秒)
         self.timeout = 30  # 请求超时时间
 
     def run(self):
+        try:
+            payload = self._build_payload(self.file_content)
+            cache_key = make_key(payload)
+            cached = get_cache().get(cache_key)
+            if cached is not None:
+                self.analysis_complete.emit(cached, self.paper_name, self.paper_path)
+                return
+
+            result = self._complete(payload)
+            get_cache().put(cache_key, result)
+            self.analysis_complete.emit(result, self.paper_name, self.paper_path)
+        except RequestCancelled:
+            return
+        except Exception as e:
+            self.error_occurred.emit(str(e))
+
+    def _complete(self, payload):
+        """发送请求并返回回复文本，失败时按策略重试；停止时抛出RequestCancelled"""
         attempt = 0
+        backoff = 0  # 连续非限流错误次数
         last_error = ""
-        
+
         while attempt < self.max_retries:
+            if not self.is_running():
+                raise RequestCancelled()
             try:
-                if not self.is_running():
-                    return
-                # 确保请求间隔
-                if attempt > 0:
-                    time.sleep(self.retry_delay * (2 ** (attempt-1)))
-
-                response = self._make_api_request()
-                
-                # 处理速率限制错误
+                # 网络或服务端错误按指数退避；限流由全局限流器统一暂停，无需在此等待
+                if backoff > 0:
+                    time.sleep(min(self.retry_delay * (2 ** (backoff - 1)), self.max_retry_delay))
+
+                response = self._make_api_request(payload)
+
+                # 处理速率限制错误（客户端已按Retry-After暂停全部请求，下次请求前自动等待）
                 if response.status_code == 429:
-                    raise requests.exceptions.RequestException(
-                        f"Rate limit exceeded. Retry after {response.headers.get('Retry-After', 60)} seconds"
-                    )
-                
+                    backoff = 0
+                    attempt += 1
+                    last_error = "Rate limit exceeded (429)"
+                    continue
+
                 # 处理其他错误状态码
                 if response.status_code != 200:
                     error_msg = f"API Error [{response.status_code}]: {response.text[:200]}"
                     raise requests.exceptions.HTTPError(error_msg)
 
-                # 成功处理
-                result = response.json()['choices'][0]['message']['content']
-                self.analysis_complete.emit(result, self.paper_name, self.paper_path)
-                return
+                return response.json()['choices'][0]['message']['content']
 
             except requests.exceptions.RequestException as e:
                 last_error = str(e)
                 attempt += 1
-                if 'Rate limit' in last_error and 'Retry-After' in last_error:
-                    # 从错误信息中提取建议等待时间
-                    retry_after = int(re.search(r'(\d+) seconds', last_error).group(1))
-                    time.sleep(retry_after + 10)  # 比建议时间多10秒
+                backoff += 1
                 continue
-                
+
+            except RequestCancelled:
+                raise
+
             except Exception as e:
-                last_error = str(e)
-                self.error_occurred.emit(f"Unexpected error: {last_error}")
-                break
+                raise RuntimeError(f"Unexpected error: {str(e)}")
 
         # 所有重试失败后
-        self.error_occurred.emit(f"Analysis failed after {self.max_retries} attempts. Final error: {last_error}")
-
-    def _make_api_request(self):
-        """封装API请求逻辑"""
-        headers = {
-            'Authorization': f'Bearer {self.api_key}',
-            'Content-Type': 'application/json'
-        }
+        raise RuntimeError(f"Analysis failed after {self.max_retries} attempts. Final error: {last_error}")
 
+    def _build_payload(self, content):
         messages = [
             {
                 "role": "system",
-                "content": "你是一个专业的学术研究助理，请严格按照以下结构分析文献：\n"
-                           "1. 研究背景（200字）\n2. 研究方法（300字）\n"
-                           "3. 主要发现（300字）\n4. 创新点（200字）\n"
-                           "5. 局限性与展望（200字）"
+                "content": ANALYSIS_PROMPT
             },
             {
                 "role": "system",
-                "content": self.file_content
+                "content": content
             },
             {
                 "role": "user",
@@ -91,14 +105,14 @@ class AnalysisWorker(BaseWorker):
             }
         ]
 
-        return requests.post(
-            f"{MOONSHOT_API}/chat/completions",
-            headers=headers,
-            json={
-                "model": "moonshot-v1-128k",
-                "messages": messages,
-                "temperature": 0.3,
-                "max_tokens": 1000
-            },
-            timeout=self.timeout
-        )
\ No newline at end of file
+        return {
+            "model": "moonshot-v1-128k",
+            "messages": messages,
+            "temperature": 0.3,
+            "max_tokens": 1000
+        }
+
+    def _make_api_request(self, payload):
+        """封装API请求逻辑"""
+        return get_client().chat_completion(self.api_key, payload, timeout=self.timeout,
+                                            should_continue=self.is_running)
@@ -1,28 +1,38 @@
+import os
+import time
 import requests
 from Workers.BaseWorker import BaseWorker
-from Config.Config import MOONSHOT_API
+from Utils.MoonshotClient import get_client
+from Utils.ResponseCache import get_cache, make_key
+from Utils.RateLimiter import RequestCancelled
+from Utils.PassageIndex import PassageIndex
+from Utils.TextExtraction import extract_pages
+from Utils.TokenEstimator import estimate_tokens
+from Config.Config import CHAT_TOP_K
 from PyQt5.QtCore import pyqtSignal
 
 class ChatWorker(BaseWorker):
     response_received = pyqtSignal(dict)  # 发送{'role': str, 'content': str}
+    chunk_received = pyqtSignal(str)  # 流式输出的增量文本
     error_occurred = pyqtSignal(str)
+    max_rate_limit_retries = 3  # 429时等待全局限流恢复后重试的次数
 
-    def __init__(self, api_key, content_path, question, is_translation=False):
+    def __init__(self, api_key, content, question, is_translation=False, stream=True,
+                 paper_path=None, selection=None):
         super().__init__()
         self.api_key = api_key
-        self.content_path = content_path
+        self.content = content  # 精简后的全文，无可用段落索引时作为上下文
         self.question = question
+        self.paper_path = paper_path  # 原文路径，用于检索相关段落
+        self.selection = selection  # (页码, 框选文本)
         self.is_translation = is_translation  # 新增翻译标识
+        self.stream = stream  # 流式返回，边生成边显示
+        self.first_token_ms = None
 
     def run(self):
         try:
             if not self.is_running():
                 return
-            headers = {
-                'Authorization': f'Bearer {self.api_key}',
-                'Content-Type': 'application/json'
-            }
-
             # 修改此处开始 
             if self.is_translation:
                 # 构造翻译专用消息结构
@@ -44,31 +54,53 @@ class ChatWorker(BaseWorker):
                     }
                 ]
             else:
-                # 原有逻辑：读取文献内容
-                with open(self.content_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                
+                # 只发送与问题相关的原文段落
+                content = self._retrieve_context()
                 messages = [
                     {"role": "system", "content": content},
                     {"role": "user", "content": self.question}
                 ]
             # 修改结束
 
-            response = requests.post(
-                f"{MOONSHOT_API}/chat/completions",
-                headers=headers,
-                json={
-                    "model": "moonshot-v1-128k",
-                    "messages": messages,
-                    "temperature": 0.0,  # 更确定性的输出
-                    "top_p": 0.1,
-                    "max_tokens": 4096  # 限制最大输出长度
-                },
-                timeout=60
-            )
+            payload = {
+                "model": "moonshot-v1-128k",
+                "messages": messages,
+                "temperature": 0.0,  # 更确定性的输出
+                "top_p": 0.1,
+                "max_tokens": 4096,  # 限制最大输出长度
+                "stream": self.stream
+            }
+            # 翻译结果只取决于原文，相同文本直接返回缓存
+            cache_key = make_key(payload) if self.is_translation else None
+            if cache_key:
+                cached = get_cache().get(cache_key)
+                if cached is not None:
+                    self.response_received.emit({'role': 'assistant', 'content': cached})
+                    return
+
+            client = get_client()
+            for _ in range(self.max_rate_limit_retries + 1):
+                start = time.perf_counter()
+                response = client.chat_completion(
+                    self.api_key,
+                    payload,
+                    timeout=60,  # 流式请求中为相邻两次数据之间的最长等待
+                    stream=self.stream,
+                    should_continue=self.is_running
+                )
+                if response.status_code != 429:
+                    break
+                response.close()
 
             if response.status_code == 200:
-                answer = response.json()['choices'][0]['message']['content']
+                if self.stream:
+                    answer = self._read_stream(client, response, start)
+                    if answer is None:
+                        return
+                else:
+                    answer = response.json()['choices'][0]['message']['content']
+                if cache_key:
+                    get_cache().put(cache_key, answer)
                 self.response_received.emit({
                     'role': 'assistant',
                     'content': answer
@@ -76,7 +108,37 @@ class ChatWorker(BaseWorker):
             else:
                 self.error_occurred.emit(f"API请求失败: {response.text}")
 
+        except RequestCancelled:
+            return
         except requests.exceptions.Timeout:
             self.error_occurred.emit("请求超时，请检查网络连接")
         except Exception as e:
-            self.error_occurred.emit(f"发生未知错误: {str(e)}")
\ No newline at end of file
+            self.error_occurred.emit(f"发生未知错误: {str(e)}")
+
+    def _retrieve_context(self):
+        """BM25检索相关段落作为上下文；没有可用索引时退回整篇精简内容"""
+        index = PassageIndex.load(self.paper_path) if self.paper_path else None
+        if index is None and self.paper_path and os.path.exists(self.paper_path):
+            index = PassageIndex.build(self.paper_path, extract_pages(self.paper_path))
+        if index is None or not index.passages:
+            return self.content
+        context = "以下是文献中与问题相关的原文段落（按页码顺序）：\n\n" + \
+            index.build_context(self.question, CHAT_TOP_K, self.selection)
+        print(f"问答上下文约 {estimate_tokens(context)} tokens")
+        return context
+
+    def _read_stream(self, client, response, start):
+        """逐块读取SSE响应并转发，返回完整文本；中途停止时返回None"""
+        parts = []
+        with response:
+            for text in client.iter_stream(response):
+                if not self.is_running():
+                    return None
+                if self.first_token_ms is None:
+                    elapsed = time.perf_counter() - start
+                    self.first_token_ms = elapsed * 1000
+                    client.record_first_token(elapsed)
+                    print(f"{'翻译' if self.is_translation else '对话'}首个token耗时: {self.first_token_ms:.0f} ms")
+                parts.append(text)
+                self.chunk_received.emit(text)
+        return ''.join(parts)
@@ -1,56 +1,78 @@
 import os
-import re
-import requests
-import fitz  # PyMuPDF
+from concurrent.futures import ThreadPoolExecutor
 from Workers.BaseWorker import BaseWorker
-from Config.Config import MOONSHOT_API, ANALYSIS_DIR
+from Config.Config import REFINE_SPLIT_TOKENS, REFINE_CHUNK_TOKENS, REFINE_MAP_CONCURRENCY
+from Utils.MoonshotClient import get_client
+from Utils.ResponseCache import get_cache, make_key
+from Utils.TextExtraction import extract_pages
+from Utils.ContentTrimmer import trim_tail_sections, format_trim_report
+from Utils.TokenEstimator import estimate_tokens
+from Utils.TextChunker import chunk_by_sections
 from PyQt5.QtCore import pyqtSignal
 
+REFINE_PROMPT = ("你是一个学术助手，请帮助处理以下内容："
+                 "1. 移除参考文献、致谢、附录等非核心内容\n"
+                 "2. 保留摘要、方法、结果等核心部分\n"
+                 "3. 保持原文格式中的标题结构\n"
+                 "4. 确保关键数据和研究内容的完整性\n"
+                 "5. 用简洁的语言输出处理后的内容，语言与原论文保持一致")
+CHUNK_NOTE = "\n以下是一篇长文献按章节切分后的第{index}/{total}部分，只处理该部分内容。"
+
 class FileUploadWorker(BaseWorker):
     upload_complete = pyqtSignal(dict, str, bool)  # (file_data, paper_name, is_local)
     error_occurred = pyqtSignal(str)
+    max_rate_limit_retries = 3  # 429时等待全局限流恢复后重试的次数
 
-    def __init__(self, api_key, file_path):
+    def __init__(self, api_key, file_path, pages=None):
         super().__init__()
         self.api_key = api_key
         self.file_path = file_path
+        self.pages = pages  # 已提取的逐页文本（导入流水线传入），为None时自行提取
         self.paper_name = os.path.basename(file_path)
 
     def refine_content(self, content):
-        """调用Kimi API进行内容精简（保留API调用）"""
+        """调用Kimi API进行内容精简；超长文献按章节分段并发精简后按原顺序拼接，避免超出上下文或请求超时"""
+        if estimate_tokens(content) <= REFINE_SPLIT_TOKENS:
+            return self.refine_chunk(content, REFINE_PROMPT)
+        chunks = chunk_by_sections(content, REFINE_CHUNK_TOKENS)
+        prompts = [REFINE_PROMPT + CHUNK_NOTE.format(index=i, total=len(chunks))
+                   for i in range(1, len(chunks) + 1)]
+        with ThreadPoolExecutor(max_workers=REFINE_MAP_CONCURRENCY) as executor:
+            return "\n\n".join(executor.map(self.refine_chunk, chunks, prompts))
+
+    def refine_chunk(self, content, prompt):
+        """单次精简请求（保留API调用）"""
         try:
-            headers = {
-                'Authorization': f'Bearer {self.api_key}',
-                'Content-Type': 'application/json'
-            }
             messages = [
                 {
                     "role": "system",
-                    "content": "你是一个学术助手，请帮助处理以下内容："
-                               "1. 移除参考文献、致谢、附录等非核心内容\n"
-                               "2. 保留摘要、方法、结果等核心部分\n"
-                               "3. 保持原文格式中的标题结构\n"
-                               "4. 确保关键数据和研究内容的完整性\n"
-                               "5. 用简洁的语言输出处理后的内容，语言与原论文保持一致"
+                    "content": prompt
                 },
                 {
                     "role": "user",
                     "content": content
                 }
             ]
-            response = requests.post(
-                f"{MOONSHOT_API}/chat/completions",
-                headers=headers,
-                json={
-                    "model": "moonshot-v1-128k",
-                    "messages": messages,
-                    "temperature": 0.3,
-                    "max_tokens": 2000
-                },
-                timeout=60
-            )
+            payload = {
+                "model": "moonshot-v1-128k",
+                "messages": messages,
+                "temperature": 0.3,
+                "max_tokens": 2000
+            }
+            # 同一内容（如同一文献以不同路径导入）直接复用精简结果
+            cache_key = make_key(payload)
+            cached = get_cache().get(cache_key)
+            if cached is not None:
+                return cached
+            for _ in range(self.max_rate_limit_retries + 1):
+                response = get_client().chat_completion(self.api_key, payload, timeout=60,
+                                                        should_continue=self.is_running)
+                if response.status_code != 429:
+                    break
             if response.status_code == 200:
-                return response.json()['choices'][0]['message']['content']
+                result = response.json()['choices'][0]['message']['content']
+                get_cache().put(cache_key, result)
+                return result
             return content[:2000]  # 失败时返回原始内容的前两千字符
         except Exception as e:
             return content[:2000]
@@ -66,28 +88,21 @@ class FileUploadWorker(BaseWorker):
     def handle_upload_failure(self):
         """处理本地PDF解析"""
         try:
-            # 使用PyMuPDF提取文本
-            doc = fitz.open(self.file_path)
-            text = ""
-            for page in doc:
-                text += page.get_text()
+            # 多进程按页提取文本，线性拼接
+            pages = self.pages if self.pages is not None else extract_pages(self.file_path)
+            # 先在本地截掉参考文献、致谢、附录，再交给API精简
+            text, trim_report = trim_tail_sections(self.file_path, pages)
+            print(f"{self.paper_name}: {format_trim_report(trim_report)}")
             processed_content = self.refine_content(text)
             
-            # 生成保存路径
-            safe_name = re.sub(r'[\\/*?:"<>|]', '_', self.paper_name)
-            content_path = os.path.join(ANALYSIS_DIR, f"{safe_name}_content.txt")
-            
-            # 保存处理后的内容
-            with open(content_path, 'w', encoding='utf-8-sig') as f:
-                f.write(processed_content)
-            
             # 构造与API成功时相同结构的数据
             file_data = {
                 'id': 'local_processed',  # 标识为本地处理
                 'content': processed_content,
                 'path': self.file_path,
                 'filename': self.paper_name,
-                'content_path': content_path
+                'pages': pages,  # 逐页原文，供全文索引使用
+                'trim_report': trim_report
             }
             self.upload_complete.emit(file_data, self.paper_name, True)
         except Exception as e:
@@ -0,0 +1,32 @@
+from Workers.BaseWorker import BaseWorker
+from Utils.TextExtraction import extract_pages
+from Utils.LibraryIndex import LibraryIndex
+from Utils.PassageIndex import PassageIndex
+from PyQt5.QtCore import pyqtSignal
+
+class LibraryIndexWorker(BaseWorker):
+    """后台为文献建立全文索引与问答段落索引（增量：只处理传入的文献）"""
+    paper_indexed = pyqtSignal(str)  # 文献路径
+    error_occurred = pyqtSignal(str)
+
+    def __init__(self, papers):
+        super().__init__()
+        self.papers = papers  # [(path, name, pages)]，pages为None时自行提取
+
+    def run(self):
+        index = LibraryIndex()
+        try:
+            for path, name, pages in self.papers:
+                if not self.is_running():
+                    return
+                try:
+                    if pages is None:
+                        pages = extract_pages(path)  # 在进程池中解析，不占用FITZ_LOCK
+                    index.index_paper(path, name, pages)
+                    if not PassageIndex.exists(path):
+                        PassageIndex.build(path, pages)  # 问答检索用的段落索引
+                    self.paper_indexed.emit(path)
+                except Exception as e:
+                    self.error_occurred.emit(f"索引 {name} 失败: {str(e)}")
+        finally:
+            index.close()
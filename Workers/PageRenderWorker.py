@@ -0,0 +1,66 @@
+import threading
+import fitz  # PyMuPDF
+from PyQt5.QtCore import QObject, QRunnable, pyqtSignal
+from PyQt5.QtGui import QImage
+from Utils.FitzLock import FITZ_LOCK
+
+_thread_state = threading.local()
+
+
+def open_thread_document(file_path):
+    """每个渲染线程持有自己的文档句柄，避免与界面线程共享（调用方须持有FITZ_LOCK）"""
+    docs = getattr(_thread_state, 'docs', None)
+    if docs is None:
+        docs = _thread_state.docs = {}
+    doc = docs.get(file_path)
+    if doc is None:
+        # 只保留最近打开的文档
+        for old in docs.values():
+            old.close()
+        docs.clear()
+        doc = docs[file_path] = fitz.open(file_path)
+    return doc
+
+
+def pixmap_to_qimage(pix):
+    """零拷贝地将fitz.Pixmap包装为QImage
+
+    返回的QImage直接引用pix的缓冲区，调用方必须在转换为QPixmap之前保持pix存活。
+    PyMuPDF输出的RGB字节序与Format_RGB888一致，无需交换通道。
+    """
+    return QImage(pix.samples_ptr, pix.width, pix.height, pix.stride, QImage.Format_RGB888)
+
+
+class PageRenderSignals(QObject):
+    # 以object传递，避免Qt在跨线程排队时复制图像；pix随图像一起传递以保证缓冲区有效
+    rendered = pyqtSignal(object, object, object)  # (缓存键, QImage, fitz.Pixmap)
+    failed = pyqtSignal(object, str)
+
+
+class PageRenderTask(QRunnable):
+    """在线程池中光栅化单个页面，指定clip时只渲染该区域"""
+
+    def __init__(self, key, file_path, page_num, zoom, rotation=0, clip=None):
+        super().__init__()
+        self.key = key
+        self.file_path = file_path
+        self.page_num = page_num
+        self.zoom = zoom
+        self.rotation = rotation
+        self.clip = clip
+        self.signals = PageRenderSignals()
+        # 由PageRenderer持有引用直到结果送达；线程池自动删除会使其中的引用失效
+        self.setAutoDelete(False)
+
+    def run(self):
+        try:
+            with FITZ_LOCK:
+                doc = open_thread_document(self.file_path)
+                page = doc.load_page(self.page_num)
+                mat = fitz.Matrix(self.zoom, self.zoom).prerotate(self.rotation)
+                clip = fitz.Rect(self.clip) & page.rect if self.clip else None
+                pix = page.get_pixmap(matrix=mat, clip=clip, alpha=False)
+
+            self.signals.rendered.emit(self.key, pixmap_to_qimage(pix), pix)
+        except Exception as e:
+            self.signals.failed.emit(self.key, str(e))
@@ -0,0 +1,34 @@
+from Workers.BaseWorker import BaseWorker
+from Utils.FitzLock import FITZ_LOCK, open_document
+from PyQt5.QtCore import pyqtSignal
+
+
+class SearchWorker(BaseWorker):
+    """逐页搜索文档，按页流式返回匹配结果"""
+    page_results = pyqtSignal(int, list)  # (页码, [fitz.Rect])
+    search_finished = pyqtSignal(int)  # 匹配总数
+    error_occurred = pyqtSignal(str)
+
+    def __init__(self, file_path, search_text):
+        super().__init__()
+        self.file_path = file_path
+        self.search_text = search_text
+
+    def run(self):
+        try:
+            total = 0
+            with open_document(self.file_path) as doc:
+                with FITZ_LOCK:
+                    page_count = len(doc)
+                for page_num in range(page_count):
+                    # 每页检查一次中断标志，查询变化时尽快退出
+                    if not self.is_running():
+                        return
+                    with FITZ_LOCK:
+                        rects = doc.load_page(page_num).search_for(self.search_text)
+                    if rects:
+                        total += len(rects)
+                        self.page_results.emit(page_num, rects)
+            self.search_finished.emit(total)
+        except Exception as e:
+            self.error_occurred.emit(f"搜索失败: {str(e)}")
@@ -0,0 +1,20 @@
+from Workers.BaseWorker import BaseWorker
+from Utils.TextExtraction import extract_pages
+from PyQt5.QtCore import pyqtSignal
+
+class TextExtractWorker(BaseWorker):
+    """导入流水线的提取阶段：逐页提取文献原文"""
+    extracted = pyqtSignal(str, list)  # (文件路径, 逐页文本)
+    error_occurred = pyqtSignal(str)
+
+    def __init__(self, file_path):
+        super().__init__()
+        self.file_path = file_path
+
+    def run(self):
+        try:
+            pages = extract_pages(self.file_path)
+            if self.is_running():
+                self.extracted.emit(self.file_path, pages)
+        except Exception as e:
+            self.error_occurred.emit(f"文本提取失败: {str(e)}")
@@ -0,0 +1,19 @@
+from Workers.BaseWorker import BaseWorker
+from Utils.TextIndex import DocumentTextIndex
+from PyQt5.QtCore import pyqtSignal
+
+class TextIndexWorker(BaseWorker):
+    index_ready = pyqtSignal(str, object)  # (文件路径, DocumentTextIndex)
+    error_occurred = pyqtSignal(str)
+
+    def __init__(self, file_path):
+        super().__init__()
+        self.file_path = file_path
+
+    def run(self):
+        try:
+            index = DocumentTextIndex.load_or_build(self.file_path, self.is_running)
+            if index is not None and self.is_running():
+                self.index_ready.emit(self.file_path, index)
+        except Exception as e:
+            self.error_occurred.emit(f"文本索引构建失败: {str(e)}")